@@ -1,63 +1,187 @@
+import atexit
+import io
 import os
-import json
+import asyncio
 from datetime import datetime
 from pathlib import Path
-from core.gmail_client import get_gmail_service
-from core.llm_cache import cached_llm
-from core.ollama_llm import ollama_llm_streaming
+from core.gmail_client import (
+    MESSAGE_LIST_FIELDS,
+    batch_get_messages,
+    get_gmail_service,
+)
+from core import json_io
+from core.gmail_reader import RECORD_FIELDS, RECORD_HEADERS, email_record_from_message
+from core.semantic_cache import semantic_cached_llm_async
+from core.ollama_llm import ollama_llm_async
 
 # Use cache directory for cache files
 CACHE_DIR = Path(__file__).parent.parent / "cache"
 CACHE_DIR.mkdir(exist_ok=True)
 CACHE_FILE = CACHE_DIR / "email_summary_cache.json"
+# New summaries are appended here and folded into CACHE_FILE on exit
+JOURNAL_FILE = CACHE_DIR / "email_summary_cache.jsonl"
+
+# Only these headers (plus the snippet) are needed to build a summary prompt
+SUMMARY_HEADERS = RECORD_HEADERS
+SUMMARY_FIELDS = RECORD_FIELDS
+
+# Number of Ollama requests to run at once; match the server's OLLAMA_NUM_PARALLEL
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
 
 
 def load_cache():
-    return json.load(open(CACHE_FILE)) if CACHE_FILE.exists() else {}
+    cache = json_io.load_file(CACHE_FILE) if CACHE_FILE.exists() else {}
+    if JOURNAL_FILE.exists():
+        with JOURNAL_FILE.open("rb") as f:
+            for line in f:
+                if line.strip():
+                    cache.update(json_io.loads(line))
+    return cache
 
 
 def save_cache(cache):
     # Ensure parent directory exists
     CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(CACHE_FILE, "w") as f:
-        json.dump(cache, f, indent=2)
+    CACHE_FILE.write_bytes(json_io.dumps(cache, pretty=True))
+    if JOURNAL_FILE.exists():
+        JOURNAL_FILE.unlink()
 
 
-def fetch_unread_messages():
-    service = get_gmail_service()
+def append_cache(entries):
+    """Add entries to the cache without rewriting the whole file"""
+    if not entries:
+        return
+    JOURNAL_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with JOURNAL_FILE.open("ab") as f:
+        f.write(json_io.dumps(entries) + b"\n")
+
+
+def compact_cache():
+    """Merge journal entries into the main cache file"""
+    if JOURNAL_FILE.exists():
+        save_cache(load_cache())
+
+
+atexit.register(compact_cache)
+
+
+def fetch_unread_messages(service=None):
+    service = service or get_gmail_service()
     result = (
         service.users()
         .messages()
-        .list(userId="me", q="is:unread", maxResults=10)
+        .list(userId="me", q="is:unread", maxResults=10, fields=MESSAGE_LIST_FIELDS)
         .execute()
     )
     return result.get("messages", [])
 
 
+def parse_email_content(msg):
+    record = email_record_from_message(msg)
+    return record.subject, record.sender, record.snippet
+
+
 def fetch_email_content(service, msg_id):
     msg = (
-        service.users().messages().get(userId="me", id=msg_id, format="full").execute()
+        service.users()
+        .messages()
+        .get(
+            userId="me",
+            id=msg_id,
+            format="metadata",
+            metadataHeaders=SUMMARY_HEADERS,
+            fields=SUMMARY_FIELDS,
+        )
+        .execute()
     )
-    headers = {h["name"]: h["value"] for h in msg["payload"].get("headers", [])}
-    subject = headers.get("Subject", "(No Subject)")
-    sender = headers.get("From", "(Unknown)")
-    snippet = msg.get("snippet", "")
-    return subject, sender, snippet
+    return parse_email_content(msg)
 
 
-def summarize_emails():
+def fetch_email_records(service, msg_ids):
+    """Fetch EmailRecords for several messages in batched requests"""
+    messages = batch_get_messages(
+        service,
+        msg_ids,
+        format="metadata",
+        metadataHeaders=SUMMARY_HEADERS,
+        fields=SUMMARY_FIELDS,
+    )
+    return {msg_id: email_record_from_message(msg) for msg_id, msg in messages.items()}
+
+
+def build_summary_prompt(subject, sender, snippet):
+    return f"Summarize this email clearly in 1 sentence, then extract 3 keywords:\nFrom: {sender}\nSubject: {subject}\n\n{snippet}"
+
+
+def create_email_body(summaries):
+    """Summary email text for (subject, summary) pairs, separated by dividers"""
+    # Writing into one buffer beats join for digests of hundreds of emails
+    buf = io.StringIO()
+    sep = ""
+    for subject, summary in summaries:
+        buf.write(sep)
+        buf.write("🧾 *")
+        buf.write(subject)
+        buf.write("*\n")
+        buf.write(summary)
+        buf.write("\n")
+        sep = "\n---\n\n"
+    return buf.getvalue()
+
+
+async def _summarize_one(prompt, semaphore):
+    async with semaphore:
+        return await semantic_cached_llm_async(prompt, ollama_llm_async)
+
+
+def fetch_pending_records():
+    """EmailRecords of unread emails not yet in the summary cache, in list order"""
     cache = load_cache()
     service = get_gmail_service()
-    messages = fetch_unread_messages()
+    messages = fetch_unread_messages(service)
+    pending = [msg["id"] for msg in messages if msg["id"] not in cache]
+    if not pending:
+        # Everything is already summarized; skip the fetch
+        return []
+    records = fetch_email_records(service, pending)
+    return [records[msg_id] for msg_id in pending if msg_id in records]
+
+
+async def summarize_emails_async(executor=None):
+    """
+    Summaries of new unread emails as (subject, summary) pairs
+
+    Args:
+        executor: Executor for the blocking Gmail and cache calls, which run
+            off the event loop; None uses the loop's default executor
+    """
+    loop = asyncio.get_running_loop()
+    records = await loop.run_in_executor(executor, fetch_pending_records)
+    if not records:
+        # Nothing new to summarize; skip the prompts and the cache write
+        return []
+
+    # Submit every prompt first, then collect results in order
+    semaphore = asyncio.Semaphore(OLLAMA_NUM_PARALLEL)
+    tasks = [
+        _summarize_one(
+            build_summary_prompt(record.subject, record.sender, record.snippet),
+            semaphore,
+        )
+        for record in records
+    ]
+    results = await asyncio.gather(*tasks)
+
     summaries = []
-    for msg in messages:
-        msg_id = msg["id"]
-        if msg_id in cache:
-            continue
-        subject, sender, snippet = fetch_email_content(service, msg_id)
-        prompt = f"Summarize this email clearly in 1 sentence, then extract 3 keywords:\nFrom: {sender}\nSubject: {subject}\n\n{snippet}"
-        result = cached_llm(prompt, ollama_llm_streaming)
-        cache[msg_id] = {"subject": subject, "summary": result["text"]}
-        summaries.append((subject, result["text"]))
-    save_cache(cache)
+    new_entries = {}
+    for record, result in zip(records, results):
+        summaries.append((record.subject, result["text"]))
+        # Failed calls (reported with zero confidence) are retried next time
+        if result.get("confidence", 1) > 0:
+            new_entries[record.id] = {"subject": record.subject, "summary": result["text"]}
+    await loop.run_in_executor(executor, append_cache, new_entries)
     return summaries
+
+
+def summarize_emails():
+    return asyncio.run(summarize_emails_async())
@@ -1,17 +1,84 @@
 import os
 import os.path
+import binascii
+import json
 import logging
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+import httplib2
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from base64 import urlsafe_b64decode
+from googleapiclient.model import JsonModel
 from email import message_from_bytes
+from email.header import Header
+from core import json_io
+
+try:
+    from pybase64 import urlsafe_b64decode, urlsafe_b64encode
+except ImportError:  # pybase64 is optional; fall back to the standard library
+    from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+__all__ = [
+    "ATTACHMENT_FIELDS",
+    "ENV_CONFIG",
+    "GMAIL_BATCH_SIZE",
+    "MESSAGE_FIELDS",
+    "MESSAGE_LABEL_FIELDS",
+    "MESSAGE_LIST_FIELDS",
+    "MESSAGE_METADATA_FIELDS",
+    "MESSAGE_RAW_FIELDS",
+    "SCOPES",
+    "batch_get_messages",
+    "build_raw_message",
+    "find_config_file",
+    "get_config_directory",
+    "get_gmail_service",
+    "get_latest_email",
+    "load_env_config",
+    "reset_gmail_service",
+    "test_gmail_connection",
+]
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Socket timeout in seconds for Gmail API requests
+GMAIL_HTTP_TIMEOUT = int(os.getenv("GMAIL_HTTP_TIMEOUT", "60"))
+
+# Tokens expiring within this window are refreshed when the service is built,
+# so the saved token covers the run instead of expiring part way through
+TOKEN_REFRESH_SKEW = timedelta(seconds=300)
+
+# Gmail accepts at most 100 calls in a single batch request
+GMAIL_BATCH_SIZE = 100
+
+# Partial-response masks so Gmail only returns the fields we read
+MESSAGE_LIST_FIELDS = "messages(id)"
+MESSAGE_FIELDS = "id,threadId,labelIds,snippet,sizeEstimate,payload(headers,mimeType,body,parts)"
+MESSAGE_METADATA_FIELDS = "id,threadId,labelIds,snippet,sizeEstimate,payload/headers"
+MESSAGE_RAW_FIELDS = "raw"
+MESSAGE_LABEL_FIELDS = "id,labelIds"
+ATTACHMENT_FIELDS = "data"
+
+
+class _GmailJsonModel(JsonModel):
+    """JsonModel that parses responses with json_io (orjson when installed)"""
+
+    def deserialize(self, content):
+        try:
+            body = json_io.loads(content)
+        except ValueError:
+            # Non-JSON bodies are passed through as text, like JsonModel
+            return content.decode("utf-8") if isinstance(content, bytes) else content
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
+
 
 def get_config_directory():
     """Get the FastMCP Gmail configuration directory"""
@@ -96,9 +163,75 @@ ENV_CONFIG = load_env_config()
 SCOPES = ENV_CONFIG["scopes"]
 
 
+# Gmail service shared by the whole process (built on first use)
+_gmail_service = None
+_service_lock = threading.Lock()
+
+
 def get_gmail_service():
     """
     Get authenticated Gmail service with environment configuration support
+
+    The service is built once per process and reused. Its credentials refresh
+    themselves when a request is made, so later calls skip the token file,
+    OAuth checks and discovery document work.
+    """
+    global _gmail_service
+
+    if _gmail_service is not None:
+        return _gmail_service
+
+    with _service_lock:
+        if _gmail_service is None:
+            _gmail_service = _build_gmail_service()
+    return _gmail_service
+
+
+def reset_gmail_service():
+    """Drop the shared Gmail service so the next call re-authenticates"""
+    global _gmail_service
+
+    with _service_lock:
+        _gmail_service = None
+
+
+def _token_expires_soon(creds):
+    """Whether credentials are invalid or expire within TOKEN_REFRESH_SKEW"""
+    if not creds.valid:
+        return True
+    if creds.expiry is None:
+        return False
+    # google-auth stores expiry as a naive UTC datetime
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now < TOKEN_REFRESH_SKEW
+
+
+def _save_token(token_file, new_json, old_json=None):
+    """
+    Write token JSON atomically, skipping the write if nothing changed
+
+    The token is written to a temporary file in the same directory and moved
+    into place, so a crash or a concurrent process never sees a partial file.
+    """
+    if new_json == old_json:
+        logger.debug(f"Credentials unchanged, not rewriting {token_file}")
+        return
+
+    token_dir = os.path.dirname(os.path.abspath(token_file))
+    fd, tmp_path = tempfile.mkstemp(dir=token_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as token:
+            token.write(new_json)
+        os.replace(tmp_path, token_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    logger.debug(f"Saved credentials to {token_file}")
+
+
+def _build_gmail_service():
+    """
+    Authenticate and build a new Gmail service
     """
     try:
         credentials_file = ENV_CONFIG["credentials_file"]
@@ -112,11 +245,13 @@ def get_gmail_service():
             )
 
         creds = None
+        token_json = None
 
         # Load existing token if available
         if os.path.exists(token_file):
             try:
-                creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+                token_json = Path(token_file).read_text()
+                creds = Credentials.from_authorized_user_info(json.loads(token_json), SCOPES)
                 logger.debug(f"Loaded existing credentials from {token_file}")
             except Exception as e:
                 logger.warning(f"Could not load token file {token_file}: {e}")
@@ -127,41 +262,51 @@ def get_gmail_service():
                     pass
 
         # Refresh or create new credentials
+        creds_updated = False
+        if creds and creds.refresh_token and _token_expires_soon(creds):
+            try:
+                logger.info("Refreshing expiring credentials...")
+                creds.refresh(Request())
+                creds_updated = True
+                logger.info("Credentials refreshed successfully")
+            except Exception as e:
+                logger.error(f"Failed to refresh credentials: {e}")
+                creds = None
+
         if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                try:
-                    logger.info("Refreshing expired credentials...")
-                    creds.refresh(Request())
-                    logger.info("Credentials refreshed successfully")
-                except Exception as e:
-                    logger.error(f"Failed to refresh credentials: {e}")
-                    creds = None
-
-            if not creds:
-                logger.info("Starting OAuth flow for new credentials...")
-                try:
-                    flow = InstalledAppFlow.from_client_secrets_file(
-                        credentials_file, SCOPES
-                    )
-                    creds = flow.run_local_server(port=0)
-                    logger.info("OAuth flow completed successfully")
-                except Exception as e:
-                    logger.error(f"OAuth flow failed: {e}")
-                    raise Exception(
-                        f"Failed to authenticate with Gmail API. "
-                        f"Please check your credentials file and internet connection. Error: {e}"
-                    )
+            logger.info("Starting OAuth flow for new credentials...")
+            try:
+                flow = InstalledAppFlow.from_client_secrets_file(credentials_file, SCOPES)
+                creds = flow.run_local_server(port=0)
+                creds_updated = True
+                logger.info("OAuth flow completed successfully")
+            except Exception as e:
+                logger.error(f"OAuth flow failed: {e}")
+                raise Exception(
+                    f"Failed to authenticate with Gmail API. "
+                    f"Please check your credentials file and internet connection. Error: {e}"
+                )
 
+        if creds_updated:
             # Save credentials
             try:
-                with open(token_file, "w") as token:
-                    token.write(creds.to_json())
-                logger.debug(f"Saved credentials to {token_file}")
+                _save_token(token_file, creds.to_json(), token_json)
             except Exception as e:
                 logger.warning(f"Could not save token file: {e}")
 
-        # Build and return service
-        service = build("gmail", "v1", credentials=creds)
+        # Build and return service. The authorized transport keeps one
+        # keep-alive TLS connection for every call made through the service,
+        # and the bundled discovery document avoids a network fetch. Responses,
+        # including batch parts, are parsed by _GmailJsonModel
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=GMAIL_HTTP_TIMEOUT))
+        service = build(
+            "gmail",
+            "v1",
+            http=http,
+            cache_discovery=False,
+            static_discovery=True,
+            model=_GmailJsonModel(),
+        )
         logger.info("Gmail service initialized successfully")
         return service
 
@@ -170,13 +315,91 @@ def get_gmail_service():
         raise
 
 
+def batch_get_messages(service, message_ids, **get_params):
+    """
+    Fetch several messages with Gmail batch requests instead of one call per ID
+
+    Args:
+        service: Gmail API service object
+        message_ids: Iterable of Gmail message IDs
+        **get_params: Extra users().messages().get() parameters (e.g. format)
+
+    Returns:
+        Dictionary mapping message ID to message resource. Messages that
+        failed to load are logged and left out.
+    """
+    # Batch request IDs must be unique
+    message_ids = list(dict.fromkeys(message_ids))
+    messages = {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            logger.error(f"Error fetching message {request_id}: {exception}")
+        else:
+            messages[request_id] = response
+
+    for start in range(0, len(message_ids), GMAIL_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=collect)
+        for msg_id in message_ids[start : start + GMAIL_BATCH_SIZE]:
+            batch.add(
+                service.users().messages().get(userId="me", id=msg_id, **get_params),
+                request_id=msg_id,
+            )
+        batch.execute()
+
+    logger.debug(f"Fetched {len(messages)}/{len(message_ids)} messages in batch")
+    return messages
+
+
+# Bytes of body per base64 line; 57 bytes encode to the 76 characters
+# RFC 2045 allows
+_BODY_LINE_BYTES = 57
+
+
+def build_raw_message(recipient_email, subject, body):
+    """
+    Base64url-encoded plain-text message for the Gmail send API
+
+    The single-part message is written out directly rather than through
+    email.mime, which would walk and re-encode the MIME tree on every send.
+    The body is base64-encoded, so long lines and bare newlines in generated
+    text cannot break the message.
+    """
+    if "\r" in recipient_email or "\n" in recipient_email:
+        raise ValueError(f"Invalid recipient address: {recipient_email!r}")
+    if "\r" in subject or "\n" in subject:
+        raise ValueError(f"Invalid subject: {subject!r}")
+    if not subject.isascii():
+        subject = Header(subject, "utf-8", header_name="Subject").encode(linesep="\r\n")
+    head = (
+        f"To: {recipient_email}\r\n"
+        "From: me\r\n"
+        f"Subject: {subject}\r\n"
+        "MIME-Version: 1.0\r\n"
+        "Content-Type: text/plain; charset=utf-8\r\n"
+        "Content-Transfer-Encoding: base64\r\n"
+        "\r\n"
+    )
+    data = body.encode("utf-8")
+    body_lines = b"\r\n".join(
+        binascii.b2a_base64(data[start : start + _BODY_LINE_BYTES], newline=False)
+        for start in range(0, len(data), _BODY_LINE_BYTES)
+    )
+    return urlsafe_b64encode(head.encode("ascii") + body_lines).decode("ascii")
+
+
 def get_latest_email():
     """
     Get the latest email with enhanced error handling
     """
     try:
         service = get_gmail_service()
-        results = service.users().messages().list(userId="me", maxResults=1).execute()
+        results = (
+            service.users()
+            .messages()
+            .list(userId="me", maxResults=1, fields=MESSAGE_LIST_FIELDS)
+            .execute()
+        )
         messages = results.get("messages", [])
 
         if not messages:
@@ -189,10 +412,10 @@ def get_latest_email():
         msg = (
             service.users()
             .messages()
-            .get(userId="me", id=msg_id, format="raw")
+            .get(userId="me", id=msg_id, format="raw", fields=MESSAGE_RAW_FIELDS)
             .execute()
         )
-        raw_data = urlsafe_b64decode(msg["raw"].encode("ASCII"))
+        raw_data = urlsafe_b64decode(msg["raw"])
         mime_msg = message_from_bytes(raw_data)
 
         subject = mime_msg.get("Subject", "(No Subject)")
@@ -236,7 +459,12 @@ def test_gmail_connection():
         logger.info(f"Total messages in mailbox: {total_messages}")
 
         # Test reading emails
-        results = service.users().messages().list(userId="me", maxResults=1).execute()
+        results = (
+            service.users()
+            .messages()
+            .list(userId="me", maxResults=1, fields=MESSAGE_LIST_FIELDS)
+            .execute()
+        )
         messages = results.get("messages", [])
 
         if messages:
@@ -249,20 +477,3 @@ def test_gmail_connection():
     except Exception as e:
         logger.error(f"Gmail connection test failed: {e}")
         return False, str(e)
-    if not messages:
-        return None
-    msg = (
-        service.users()
-        .messages()
-        .get(userId="me", id=messages[0]["id"], format="raw")
-        .execute()
-    )
-    raw_data = urlsafe_b64decode(msg["raw"].encode("ASCII"))
-    mime_msg = message_from_bytes(raw_data)
-    subject = mime_msg.get("Subject", "(No Subject)")
-    sender = mime_msg.get("From", "(Unknown)")
-    body = mime_msg.get_payload(decode=True)
-    if body is None and mime_msg.is_multipart():
-        body = mime_msg.get_payload(0).get_payload(decode=True)
-    body = body.decode(errors="ignore") if body else ""
-    return subject.strip(), sender.strip(), body.strip()
@@ -2,31 +2,428 @@
 Enhanced Gmail Reader with comprehensive email processing capabilities
 """
 
-import base64
 import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from typing import Dict, List, Optional, Any
-from datetime import datetime
+from datetime import date, datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
 import json
 
+try:
+    from pybase64 import urlsafe_b64decode
+except ImportError:  # pybase64 is optional; fall back to the standard library
+    from base64 import urlsafe_b64decode
+
+from . import json_io
+from .gmail_client import (
+    ATTACHMENT_FIELDS,
+    GMAIL_BATCH_SIZE,
+    MESSAGE_FIELDS,
+    MESSAGE_LABEL_FIELDS,
+    MESSAGE_LIST_FIELDS,
+    MESSAGE_METADATA_FIELDS,
+    batch_get_messages,
+    get_gmail_service,
+)
+
+# Compiled once for HTML to text conversion. Equivalent to the lazy
+# "<[^<]+?>" but cannot backtrack on unterminated tags
+_TAG_RE = re.compile(r"<[^<>]+>")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Headers used by GmailReader when messages are fetched in metadata format
+METADATA_HEADERS = [
+    "Subject",
+    "From",
+    "To",
+    "Cc",
+    "Bcc",
+    "Date",
+    "Importance",
+    "X-Priority",
+    "Content-Type",
+]
+
+
+# Base64 characters decoded per step when streaming; a multiple of 4 so every
+# window decodes on its own (64KB of base64 is 48KB of output)
+BASE64_CHUNK_SIZE = 64 * 1024
+
+
+# Message payloads already read by ID. Kept in memory, and across runs in
+# MESSAGE_CACHE_FILE only when GMAIL_MESSAGE_CACHE_PERSIST is true
+CACHE_DIR = Path(__file__).parent.parent / "cache"
+CACHE_DIR.mkdir(exist_ok=True)
+MESSAGE_CACHE_FILE = CACHE_DIR / "gmail_messages.jsonl"
+MESSAGE_CACHE_SIZE = int(os.getenv("GMAIL_MESSAGE_CACHE_SIZE", "200"))
+MESSAGE_CACHE_PERSIST = os.getenv("GMAIL_MESSAGE_CACHE_PERSIST", "false").lower() == "true"
+
+
+# Headers needed to build an EmailRecord
+RECORD_HEADERS = ["Subject", "From"]
+RECORD_FIELDS = "id,labelIds,snippet,payload/headers"
+
+
+@dataclass
+class EmailRecord:
+    """Lightweight email view with only the fields used to build LLM prompts"""
+
+    __slots__ = ("id", "subject", "sender", "snippet", "labels")
+
+    id: str
+    subject: str
+    sender: str
+    snippet: str
+    labels: List[str]
+
+
+def email_record_from_message(message):
+    """Build an EmailRecord from a Gmail message resource (any format)"""
+    subject = "(No Subject)"
+    sender = "(Unknown)"
+    for header in message.get("payload", {}).get("headers", []):
+        name = header["name"].lower()
+        if name == "subject":
+            subject = header["value"]
+        elif name == "from":
+            sender = header["value"]
+    return EmailRecord(
+        id=message.get("id"),
+        subject=subject,
+        sender=sender,
+        snippet=message.get("snippet", ""),
+        labels=message.get("labelIds", []),
+    )
+
+
+def iter_base64_chunks(data, chunk_size=BASE64_CHUNK_SIZE):
+    """
+    Decode base64url data in fixed windows, yielding the bytes of each
+
+    Only one decoded window is held at a time, so large attachment bodies
+    can be written out without building the whole decoded copy in memory.
+    """
+    chunk_size -= chunk_size % 4
+    for start in range(0, len(data), chunk_size):
+        window = data[start : start + chunk_size]
+        # Gmail may leave the padding off the final window
+        if len(window) % 4:
+            window += "=" * (-len(window) % 4)
+        yield urlsafe_b64decode(window)
+
+
+def _header_index(payload):
+    """Lower-cased header names mapped to their values, built in one pass"""
+    return {
+        header.get("name", "").lower(): header.get("value", "")
+        for header in payload.get("headers", [])
+    }
+
+
+def build_search_query(query=None, unread_only=False, label=None, since=None):
+    """
+    Combine filters into one Gmail search query so Gmail does the filtering
+
+    Args:
+        query: Gmail search query string (optional)
+        unread_only: Only match unread emails
+        label: Only match emails with this label (optional)
+        since: Only match emails newer than this many days, or received on or
+            after this date/datetime (optional)
+
+    Returns:
+        Query string, or None if there are no filters
+    """
+    terms = [query] if query else []
+    if unread_only:
+        terms.append("is:unread")
+    if label:
+        terms.append(f'label:"{label}"' if " " in label else f"label:{label}")
+    if isinstance(since, (date, datetime)):
+        terms.append(f"after:{since:%Y/%m/%d}")
+    elif since is not None:
+        terms.append(f"newer_than:{int(since)}d")
+    return " ".join(terms) or None
+
+
+# Worker processes used to parse large reads (0 disables the pool). Parsing is
+# CPU-bound Python, so threads would not run it in parallel
+PARSE_WORKERS = int(os.getenv("GMAIL_PARSE_WORKERS", "0"))
+# Smaller reads are parsed in-process; pickling would cost more than it saves
+PARSE_POOL_MIN_MESSAGES = 20
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool():
+    global _parse_pool
+
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _parse_pool
+
+
+# GmailReader used inside a parse worker process
+_worker_reader = None
+
+
+def _extract_in_worker(message):
+    global _worker_reader
+
+    if _worker_reader is None:
+        _worker_reader = GmailReader(None)
+    return _worker_reader._extract_email_data(message)
+
+
+class LazyEmailData(dict):
+    """
+    Email dictionary whose content is decoded on first access
+
+    Decoding bodies (base64 and HTML to text) is the costly part of parsing a
+    message, so it is deferred until "content" is read. Python-level
+    operations that need every value (iteration, comparison, copying,
+    pickling) load it, but C serializers such as orjson and pydantic read the
+    dict storage directly and silently omit unloaded keys. Only hand these to
+    code that reads fields with [] or get(); call copy() before serializing.
+    """
+
+    def __init__(self, data, loaders):
+        super().__init__(data)
+        self._loaders = loaders
+
+    def _load(self, key):
+        loader = self._loaders.pop(key, None)
+        if loader is not None:
+            dict.__setitem__(self, key, loader())
+
+    def _load_all(self):
+        for key in list(self._loaders):
+            self._load(key)
+
+    def __getitem__(self, key):
+        self._load(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._load(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        return key in self._loaders or super().__contains__(key)
+
+    def __len__(self):
+        return super().__len__() + len(self._loaders)
+
+    def __iter__(self):
+        self._load_all()
+        return super().__iter__()
+
+    def keys(self):
+        self._load_all()
+        return super().keys()
+
+    def values(self):
+        self._load_all()
+        return super().values()
+
+    def items(self):
+        self._load_all()
+        return super().items()
+
+    def copy(self):
+        self._load_all()
+        return dict(self)
+
+    def __eq__(self, other):
+        self._load_all()
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._load_all()
+        return super().__repr__()
+
+    def __reduce__(self):
+        return (dict, (self.copy(),))
+
+
+class MessageCache:
+    """
+    Bounded store of Gmail message payloads keyed by message ID
+
+    A message's headers and bodies never change once it is sent, so a cached
+    payload can stand in for downloading the message again. Labels do change
+    and are left out; callers fetch them fresh. The least recently used
+    messages are dropped beyond max_entries. With persist=True messages are
+    also appended to a JSONL file, which is rewritten once it holds twice
+    max_entries lines.
+    """
+
+    # Resource fields that change after a message is sent
+    MUTABLE_FIELDS = ("labelIds", "historyId")
+
+    def __init__(self, path, max_entries=None, persist=False):
+        """
+        Args:
+            path: JSONL file the messages are stored in when persisted
+            max_entries: Most messages kept (default: MESSAGE_CACHE_SIZE)
+            persist: Whether to keep messages across runs in path
+        """
+        self.path = Path(path)
+        self.max_entries = MESSAGE_CACHE_SIZE if max_entries is None else max_entries
+        self.persist = persist
+        self._messages = None
+        self._lines = 0
+        self._lock = threading.Lock()
+
+    def _get_messages(self):
+        if self._messages is None:
+            self._messages = {}
+            self._lines = 0
+            if self.persist and self.path.exists():
+                with self.path.open("rb") as f:
+                    for line in f:
+                        if line.strip():
+                            message = json_io.loads(line)
+                            self._messages.pop(message["id"], None)
+                            self._messages[message["id"]] = message
+                            self._lines += 1
+                self._trim()
+        return self._messages
+
+    def _trim(self):
+        # Dicts keep insertion order, and lookups move entries to the end
+        while len(self._messages) > self.max_entries:
+            del self._messages[next(iter(self._messages))]
+
+    def _rewrite(self):
+        """Replace the file with one line per message currently kept"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for message in self._messages.values():
+                    f.write(json_io.dumps(message) + b"\n")
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._lines = len(self._messages)
+
+    def reset(self):
+        """Drop the in-memory copy so messages are reloaded from disk"""
+        with self._lock:
+            self._messages = None
+
+    def get(self, message_id):
+        """Cached message payload for an ID, without labels, if any"""
+        with self._lock:
+            messages = self._get_messages()
+            message = messages.pop(message_id, None)
+            if message is not None:
+                messages[message_id] = message
+            return message
+
+    def put(self, message):
+        """Store a message resource under its ID, without its mutable fields"""
+        message = {
+            name: value for name, value in message.items() if name not in self.MUTABLE_FIELDS
+        }
+        with self._lock:
+            messages = self._get_messages()
+            messages.pop(message["id"], None)
+            messages[message["id"]] = message
+            self._trim()
+            if not self.persist:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self._lines >= 2 * self.max_entries:
+                self._rewrite()
+            else:
+                with self.path.open("ab") as f:
+                    f.write(json_io.dumps(message) + b"\n")
+                self._lines += 1
+
+
+_message_cache = MessageCache(MESSAGE_CACHE_FILE, persist=MESSAGE_CACHE_PERSIST)
+
 
 class GmailReader:
     """Enhanced Gmail reader with filtering, content extraction, and error handling"""
 
-    def __init__(self, service, logger=None):
+    def __init__(self, service, logger=None, cache=None):
         """
         Initialize Gmail reader with service and optional logger
 
         Args:
             service: Gmail API service object
             logger: Optional logger for debugging and monitoring
+            cache: MessageCache for read_email_by_id (default: shared
+                process-wide cache)
         """
         self.service = service
         self.logger = logger or logging.getLogger(__name__)
+        self.cache = _message_cache if cache is None else cache
         self.logger.info("GmailReader initialized")
 
-    def read_emails(self, count=10, query=None, include_spam_trash=False):
+    def _list_request(self, count, query, include_spam_trash):
+        """users().messages().list() request for message IDs matching a query"""
+        request_params = {
+            "userId": "me",
+            "maxResults": count,
+            "fields": MESSAGE_LIST_FIELDS,
+        }
+
+        if query:
+            request_params["q"] = query
+
+        # Gmail leaves spam and trash out of list results unless asked
+        if include_spam_trash:
+            request_params["includeSpamTrash"] = True
+
+        return self.service.users().messages().list(**request_params)
+
+    def list_ids(self, count=10, query=None, include_spam_trash=False):
+        """List message IDs matching a query, newest first"""
+        result = self._list_request(count, query, include_spam_trash).execute()
+        return [message["id"] for message in result.get("messages", [])]
+
+    def batch_get(self, ids, format="full", **get_params):
         """
-        Read multiple emails with optional filtering
+        Fetch messages in Gmail batch requests of up to GMAIL_BATCH_SIZE each
+
+        Args:
+            ids: Gmail message IDs, e.g. from list_ids
+            format: Gmail message format (default: "full")
+            **get_params: Extra users().messages().get() parameters, which
+                override the default fields mask and metadata headers
+
+        Returns:
+            List of message resources in the order of ids. Messages that
+            failed to load are left out.
+        """
+        params = {"format": format, "fields": MESSAGE_FIELDS}
+        if format == "metadata":
+            params["metadataHeaders"] = METADATA_HEADERS
+            params["fields"] = MESSAGE_METADATA_FIELDS
+        params.update(get_params)
+        fetched = batch_get_messages(self.service, ids, **params)
+        return [fetched[msg_id] for msg_id in ids if msg_id in fetched]
+
+    def read_email_records(self, count=10, query=None, include_spam_trash=False):
+        """
+        Read multiple emails as EmailRecord objects
+
+        Only the subject and sender headers, snippet and labels are fetched,
+        which is all a summary prompt needs. Use read_emails for full content.
 
         Args:
             count: Number of emails to read (default: 10)
@@ -34,40 +431,75 @@ class GmailReader:
             include_spam_trash: Whether to include spam and trash (default: False)
 
         Returns:
-            List of email dictionaries with enhanced content
+            List of EmailRecord objects in mailbox order
         """
         try:
-            self.logger.info(f"Reading {count} emails with query: {query}")
+            self.logger.info(f"Reading {count} email records with query: {query}")
+            message_ids = self.list_ids(count, query, include_spam_trash)
+            messages = self.batch_get(
+                message_ids,
+                format="metadata",
+                metadataHeaders=RECORD_HEADERS,
+                fields=RECORD_FIELDS,
+            )
+            return [email_record_from_message(message) for message in messages]
+
+        except Exception as e:
+            self.logger.error(f"Error reading email records: {e}")
+            raise
 
-            # Build request parameters
-            request_params = {"userId": "me", "maxResults": count}
+    def read_emails(
+        self,
+        count=10,
+        query=None,
+        include_spam_trash=False,
+        format="full",
+        since=None,
+        unread_only=False,
+        label=None,
+        lazy=False,
+        fields=None,
+    ):
+        """
+        Read multiple emails with optional filtering
 
-            if query:
-                request_params["q"] = query
+        Filters are sent to Gmail as part of the search query, so only
+        matching messages are listed and fetched.
 
-            if not include_spam_trash:
-                request_params["q"] = (
-                    request_params.get("q", "") + " -in:spam -in:trash"
-                )
+        Args:
+            count: Number of emails to read (default: 10)
+            query: Gmail search query string (optional)
+            include_spam_trash: Whether to include spam and trash (default: False)
+            format: Gmail message format (default: "full"). Use "metadata" when
+                only headers and snippet are needed; bodies are then not downloaded
+            since: Only read emails newer than this many days, or received on
+                or after this date/datetime (optional)
+            unread_only: Only read unread emails (default: False)
+            label: Only read emails with this label (optional)
+            lazy: Decode each email's content only when it is first accessed
+                (default: False). The emails are then LazyEmailData; see its
+                note on serializing
+            fields: Partial-response mask for the message fetches (optional;
+                defaults to every field the reader uses for the format)
+
+        Returns:
+            List of email dictionaries with enhanced content
+        """
+        try:
+            query = build_search_query(query, unread_only, label, since)
+            self.logger.info(f"Reading {count} emails with query: {query}")
 
             # Get message list
-            result = self.service.users().messages().list(**request_params).execute()
-            messages = result.get("messages", [])
+            message_ids = self.list_ids(count, query, include_spam_trash)
 
-            if not messages:
+            if not message_ids:
                 self.logger.info("No messages found")
                 return []
 
-            # Fetch detailed email data for each message
-            emails = []
-            for message in messages:
-                try:
-                    email_data = self.read_email_by_id(message["id"])
-                    if email_data:
-                        emails.append(email_data)
-                except Exception as e:
-                    self.logger.error(f"Error reading email {message['id']}: {e}")
-                    continue
+            # Fetch detailed email data in batched requests, keeping list order
+            get_params = {"fields": fields} if fields else {}
+            messages = self.batch_get(message_ids, format=format, **get_params)
+            emails = [email for email in self._extract_all(messages, lazy) if email]
 
             self.logger.info(f"Successfully read {len(emails)} emails")
             return emails
@@ -76,12 +508,23 @@ class GmailReader:
             self.logger.error(f"Error reading emails: {e}")
             raise
 
-    def read_email_by_id(self, email_id):
+    def _extract_all(self, messages, lazy=False):
+        """Extract email data for several messages, in a process pool if large"""
+        if lazy:
+            # Content is decoded on access, so there is little left to offload
+            return [self._extract_email_data(message, lazy=True) for message in messages]
+        if PARSE_WORKERS > 0 and len(messages) >= PARSE_POOL_MIN_MESSAGES:
+            chunksize = max(1, len(messages) // (PARSE_WORKERS * 4))
+            return list(_get_parse_pool().map(_extract_in_worker, messages, chunksize=chunksize))
+        return [self._extract_email_data(message) for message in messages]
+
+    def read_email_by_id(self, email_id, fields=None):
         """
         Read a specific email by ID
 
         Args:
             email_id: Gmail message ID
+            fields: Partial-response mask (default: MESSAGE_FIELDS)
 
         Returns:
             Dictionary with email data and content
@@ -89,39 +532,108 @@ class GmailReader:
         try:
             self.logger.debug(f"Reading email ID: {email_id}")
 
-            # Get full email data
-            message = (
-                self.service.users()
-                .messages()
-                .get(userId="me", id=email_id, format="full")
-                .execute()
-            )
+            # Only complete resources are cached; a narrower mask is fetched
+            message = None if fields else self.cache.get(email_id)
+            if message is not None:
+                # The payload is unchanged but labels are not; a minimal get
+                # refreshes them, and fails if the message has been deleted
+                labels = (
+                    self.service.users()
+                    .messages()
+                    .get(
+                        userId="me",
+                        id=email_id,
+                        format="minimal",
+                        fields=MESSAGE_LABEL_FIELDS,
+                    )
+                    .execute()
+                )
+                message = dict(message, labelIds=labels.get("labelIds", []))
+            else:
+                message = (
+                    self.service.users()
+                    .messages()
+                    .get(
+                        userId="me",
+                        id=email_id,
+                        format="full",
+                        fields=fields or MESSAGE_FIELDS,
+                    )
+                    .execute()
+                )
+                if not fields and message.get("id"):
+                    self.cache.put(message)
 
             # Extract and structure email data
             email_data = self._extract_email_data(message)
 
-            self.logger.debug(
-                f"Successfully read email: {email_data.get('subject', 'No Subject')}"
-            )
+            self.logger.debug(f"Successfully read email: {email_data.get('subject', 'No Subject')}")
             return email_data
 
         except Exception as e:
             self.logger.error(f"Error reading email {email_id}: {e}")
             raise
 
-    def search_emails(self, query, max_results=50):
+    def search_emails(self, query, max_results=50, format="full", lazy=False):
         """
         Search emails using Gmail query syntax
 
         Args:
             query: Gmail search query
             max_results: Maximum number of results
+            format: Gmail message format (default: "full"); see read_emails
+            lazy: Decode content on first access (default: False); see read_emails
 
         Returns:
             List of email dictionaries matching the query
         """
         self.logger.info(f"Searching emails with query: {query}")
-        return self.read_emails(count=max_results, query=query)
+        return self.read_emails(count=max_results, query=query, format=format, lazy=lazy)
+
+    def search_many(self, queries, max_results=50, format="full", lazy=False):
+        """
+        Run several searches in two batched round trips
+
+        The list calls for all queries share one batch request, then every
+        matching message is fetched once with batch_get, even when several
+        queries match it.
+
+        Args:
+            queries: Gmail search query strings
+            max_results: Maximum number of results per query
+            format: Gmail message format (default: "full"); see read_emails
+            lazy: Decode content on first access (default: False); see read_emails
+
+        Returns:
+            Dictionary mapping each query to its list of email dictionaries.
+            A query whose search failed maps to an empty list.
+        """
+        queries = list(dict.fromkeys(queries))
+        ids_by_query = {query: [] for query in queries}
+
+        def collect(request_id, response, exception):
+            query = queries[int(request_id)]
+            if exception is not None:
+                self.logger.error(f"Error searching emails for {query}: {exception}")
+            else:
+                ids_by_query[query] = [m["id"] for m in response.get("messages", [])]
+
+        for start in range(0, len(queries), GMAIL_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=collect)
+            for index in range(start, min(start + GMAIL_BATCH_SIZE, len(queries))):
+                batch.add(
+                    self._list_request(max_results, queries[index], False),
+                    request_id=str(index),
+                )
+            batch.execute()
+
+        all_ids = list(dict.fromkeys(i for ids in ids_by_query.values() for i in ids))
+        messages = self.batch_get(all_ids, format=format)
+        emails = {email["id"]: email for email in self._extract_all(messages, lazy) if email}
+        return {
+            query: [emails[msg_id] for msg_id in ids if msg_id in emails]
+            for query, ids in ids_by_query.items()
+        }
 
     def get_email_content(self, email_data):
         """
@@ -170,17 +682,13 @@ class GmailReader:
             parts = payload.get("parts", [])
 
             for part in parts:
-                disposition = part.get("headers", {})
                 filename = None
 
                 # Look for Content-Disposition header
-                for header in part.get("headers", []):
-                    if header.get("name", "").lower() == "content-disposition":
-                        if "attachment" in header.get("value", "").lower():
-                            # Extract filename from header value
-                            value = header.get("value", "")
-                            if "filename=" in value:
-                                filename = value.split("filename=")[1].strip('"')
+                value = _header_index(part).get("content-disposition", "")
+                if "attachment" in value.lower() and "filename=" in value:
+                    # Extract filename from header value
+                    filename = value.split("filename=")[1].strip('"')
 
                 if filename or part.get("filename"):
                     attachment_info = {
@@ -197,19 +705,69 @@ class GmailReader:
             self.logger.error(f"Error extracting attachments: {e}")
             return []
 
-    def _extract_email_data(self, message):
-        """Extract structured data from Gmail message"""
+    def save_attachment(self, message_id, attachment_id, sink):
+        """
+        Download an attachment and write its decoded bytes to sink
+
+        The body is decoded and written in BASE64_CHUNK_SIZE windows rather
+        than decoded in one piece, which keeps peak memory close to the size
+        of the encoded response.
+
+        Args:
+            message_id: Gmail message ID
+            attachment_id: Attachment ID from extract_attachments_info
+            sink: Binary file-like object with a write() method
+
+        Returns:
+            Number of bytes written
+        """
+        attachment = (
+            self.service.users()
+            .messages()
+            .attachments()
+            .get(
+                userId="me",
+                messageId=message_id,
+                id=attachment_id,
+                fields=ATTACHMENT_FIELDS,
+            )
+            .execute()
+        )
+        written = 0
+        for chunk in iter_base64_chunks(attachment.get("data", "")):
+            sink.write(chunk)
+            written += len(chunk)
+        self.logger.debug(f"Saved attachment {attachment_id} ({written} bytes)")
+        return written
+
+    def _extract_email_data(self, message, lazy=False):
+        """
+        Extract structured data from Gmail message
+
+        With lazy=True a LazyEmailData is returned and the message bodies are
+        only decoded when "content" is first read.
+        """
         try:
             # Extract headers
-            headers = {}
-            for header in message.get("payload", {}).get("headers", []):
-                headers[header["name"].lower()] = header["value"]
+            headers = _header_index(message.get("payload", {}))
 
             # Extract content
-            content = self.get_email_content(message)
+            if lazy:
+                content = None
+            else:
+                content = self.get_email_content(message)
 
             # Extract attachments
             attachments = self.extract_attachments_info(message)
+            payload = message.get("payload", {})
+            if "parts" in payload or "body" in payload:
+                has_attachments = len(attachments) > 0
+            else:
+                # Metadata format has no parts to inspect; attachments are
+                # sent as multipart/mixed
+                has_attachments = (
+                    headers.get("content-type", "").lower().startswith("multipart/mixed")
+                )
 
             # Build structured email data
             email_data = {
@@ -225,12 +783,17 @@ class GmailReader:
                 "metadata": {
                     "importance": self._determine_importance(headers, message),
                     "is_unread": "UNREAD" in message.get("labelIds", []),
-                    "has_attachments": len(attachments) > 0,
+                    "has_attachments": has_attachments,
                     "size_estimate": message.get("sizeEstimate", 0),
                 },
                 "raw_headers": headers,
             }
 
+            if lazy:
+                del email_data["content"]
+                return LazyEmailData(
+                    email_data, {"content": lambda: self.get_email_content(message)}
+                )
             return email_data
 
         except Exception as e:
@@ -243,9 +806,7 @@ class GmailReader:
             data = body.get("data", "")
             if data:
                 # Gmail API returns base64url encoded data
-                decoded = base64.urlsafe_b64decode(data).decode(
-                    "utf-8", errors="ignore"
-                )
+                decoded = urlsafe_b64decode(data).decode("utf-8", errors="ignore")
                 return decoded
             return ""
         except Exception as e:
@@ -287,13 +848,11 @@ class GmailReader:
         try:
             # Simple HTML to text conversion
             # In a real implementation, you might want to use BeautifulSoup
-            import re
-
             # Remove HTML tags
-            text = re.sub("<[^<]+?>", "", html_content)
+            text = _TAG_RE.sub("", html_content)
 
             # Clean up whitespace
-            text = re.sub(r"\s+", " ", text)
+            text = _WHITESPACE_RE.sub(" ", text)
             text = text.strip()
 
             return text
@@ -311,9 +870,7 @@ class GmailReader:
             value = headers.get(field, "")
             if value:
                 # Simple parsing - in reality you'd want more sophisticated parsing
-                recipients.extend(
-                    [addr.strip() for addr in value.split(",") if addr.strip()]
-                )
+                recipients.extend([addr.strip() for addr in value.split(",") if addr.strip()])
 
         return recipients
 
@@ -323,9 +880,6 @@ class GmailReader:
             return None
 
         try:
-            # This is a simplified parser - you might want to use dateutil.parser
-            from email.utils import parsedate_to_datetime
-
             return parsedate_to_datetime(date_str)
         except Exception as e:
             self.logger.error(f"Error parsing date '{date_str}': {e}")
@@ -358,8 +912,6 @@ def create_gmail_reader(service=None, logger=None):
         GmailReader instance
     """
     if service is None:
-        from .gmail_client import get_gmail_service
-
         service = get_gmail_service()
 
     return GmailReader(service, logger)
@@ -0,0 +1,37 @@
+"""
+JSON helpers for cache files, using orjson when it is installed
+"""
+
+import json
+import mmap
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+
+def dumps(obj, pretty=False):
+    """Serialize obj to UTF-8 encoded JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(obj, indent=2 if pretty else None, ensure_ascii=False).encode("utf-8")
+
+
+def loads(data):
+    """Deserialize JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_file(path):
+    """Deserialize a JSON file, parsing it in place from a memory map with orjson"""
+    with open(path, "rb") as f:
+        if orjson is None or not f.seek(0, 2):
+            # Empty files cannot be mapped; let the parser report them
+            f.seek(0)
+            return loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
@@ -1,30 +1,171 @@
-import json
+import atexit
+import hashlib
+import os
+import re
+import threading
+import time
 from pathlib import Path
+from core import json_io
 from core.llm_log import log_prompt_response
 
+__all__ = [
+    "CACHE_FILE",
+    "JOURNAL_FILE",
+    "cached_llm",
+    "cached_llm_async",
+    "cached_llm_with_prefix",
+    "compact_cache",
+    "load_cache",
+    "lookup",
+    "prompt_key",
+    "reset",
+    "save_cache",
+]
+
 # Use cache directory for cache files
 CACHE_DIR = Path(__file__).parent.parent / "cache"
 CACHE_DIR.mkdir(exist_ok=True)
 CACHE_FILE = CACHE_DIR / "llm_cache.json"
+# New responses are appended here and folded into CACHE_FILE on exit
+JOURNAL_FILE = CACHE_DIR / "llm_cache.jsonl"
+
+# Entries older than this are regenerated; unset or 0 keeps them forever
+CACHE_EXPIRY_HOURS = float(os.getenv("CACHE_EXPIRY_HOURS", "0"))
+
+# Entries are keyed by a 128-bit BLAKE2b digest of the prompt
+_KEY_RE = re.compile(r"[0-9a-f]{32}")
+
+# In-memory copy of the cache, loaded from disk on first use
+_memory_cache = None
+_cache_lock = threading.RLock()
 
 
 def load_cache():
-    return json.loads(CACHE_FILE.read_text()) if CACHE_FILE.exists() else {}
+    cache = json_io.load_file(CACHE_FILE) if CACHE_FILE.exists() else {}
+    if JOURNAL_FILE.exists():
+        with JOURNAL_FILE.open("rb") as f:
+            for line in f:
+                if line.strip():
+                    cache.update(json_io.loads(line))
+    return cache
 
 
 def save_cache(cache):
-    # Ensure parent directory exists
-    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    CACHE_FILE.write_text(json.dumps(cache, indent=2))
+    global _memory_cache
+    with _cache_lock:
+        # Ensure parent directory exists
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        CACHE_FILE.write_bytes(json_io.dumps(cache, pretty=True))
+        if JOURNAL_FILE.exists():
+            JOURNAL_FILE.unlink()
+        _memory_cache = dict(cache)
+
+
+def compact_cache():
+    """Merge journal entries into the main cache file"""
+    with _cache_lock:
+        if not JOURNAL_FILE.exists():
+            return
+        # Re-read the files: other processes may have journaled entries since
+        # this one loaded them. Where both have a key, the newer entry wins
+        merged = _rekeyed(load_cache())
+        for key, entry in (_memory_cache or {}).items():
+            current = merged.get(key)
+            if current is None or entry.get("cached_at", 0) >= current.get("cached_at", 0):
+                merged[key] = entry
+        save_cache(merged)
+
+
+atexit.register(compact_cache)
+
+
+def reset():
+    """Drop the in-memory copy so entries are reloaded from disk"""
+    global _memory_cache
+    with _cache_lock:
+        _memory_cache = None
+
+
+def prompt_key(prompt):
+    """Cache key for a prompt"""
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _rekeyed(cache):
+    # Older caches were keyed by the full prompt text
+    return {
+        key if _KEY_RE.fullmatch(key) else prompt_key(key): value for key, value in cache.items()
+    }
+
+
+def _get_memory_cache():
+    global _memory_cache
+    if _memory_cache is None:
+        _memory_cache = _rekeyed(load_cache())
+    return _memory_cache
+
+
+def _remember(prompt, result):
+    # Failed calls (reported with zero confidence) are retried next time
+    if result.get("confidence", 1) <= 0:
+        return
+    key = prompt_key(prompt)
+    entry = dict(result, cached_at=time.time())
+    with _cache_lock:
+        _get_memory_cache()[key] = entry
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with JOURNAL_FILE.open("ab") as f:
+            f.write(json_io.dumps({key: entry}) + b"\n")
+
+
+def lookup(prompt):
+    """Cached response for a prompt, or None on a miss or an expired entry"""
+    key = prompt_key(prompt)
+    with _cache_lock:
+        entry = _get_memory_cache().get(key)
+    if entry is None or "cached_at" not in entry:
+        # Entries written before timestamps were added never expire
+        return entry
+    if CACHE_EXPIRY_HOURS and time.time() - entry["cached_at"] > (CACHE_EXPIRY_HOURS * 3600):
+        return None
+    return {name: value for name, value in entry.items() if name != "cached_at"}
 
 
 def cached_llm(prompt, llm_func):
-    cache = load_cache()
-    if prompt in cache:
+    cached = lookup(prompt)
+    if cached is not None:
         print("🧠 Using cached response.")
-        return cache[prompt]
+        return cached
     result = llm_func(prompt)
-    cache[prompt] = result
-    save_cache(cache)
+    _remember(prompt, result)
+    log_prompt_response(prompt, result["text"])
+    return result
+
+
+def cached_llm_with_prefix(prefix, suffix, llm_func):
+    """
+    cached_llm for a prompt split into fixed instructions and variable content
+
+    llm_func is called as llm_func(suffix, system=prefix) so the backend can
+    keep the prefix as a stable system prompt and reuse its cached state.
+    """
+    prompt = f"{prefix}\n\n{suffix}"
+    cached = lookup(prompt)
+    if cached is not None:
+        print("🧠 Using cached response.")
+        return cached
+    result = llm_func(suffix, system=prefix)
+    _remember(prompt, result)
+    log_prompt_response(prompt, result["text"])
+    return result
+
+
+async def cached_llm_async(prompt, llm_func):
+    cached = lookup(prompt)
+    if cached is not None:
+        print("🧠 Using cached response.")
+        return cached
+    result = await llm_func(prompt)
+    _remember(prompt, result)
     log_prompt_response(prompt, result["text"])
     return result
@@ -1,16 +1,69 @@
+import atexit
+import threading
 from datetime import datetime
 from pathlib import Path
 
+__all__ = ["LOG_FILE", "close_log", "flush_log", "log_prompt_response"]
+
 # Use logs directory for log files
 LOG_DIR = Path(__file__).parent.parent / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 LOG_FILE = LOG_DIR / "llm_log.md"
 
+# Entries are buffered and written out after this many, on flush_log() and at exit
+LOG_FLUSH_EVERY = 20
+
+# Log file kept open between entries, opened on first use
+_log_file = None
+_pending = 0
+_log_lock = threading.Lock()
+
+
+def _open_log():
+    global _log_file
+    # Reopen if LOG_FILE has been pointed somewhere else
+    if _log_file is not None and _log_file.name != str(LOG_FILE):
+        _log_file.close()
+        _log_file = None
+    if _log_file is None:
+        # Ensure parent directory exists
+        LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        # Append rather than rewrite the whole log; entries read oldest first
+        _log_file = LOG_FILE.open("a", encoding="utf-8", buffering=64 * 1024)
+    return _log_file
+
 
 def log_prompt_response(prompt, response):
+    global _pending
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     entry = f"### 🕒 {timestamp}\n\n**Prompt:**\n```\n{prompt}\n```\n\n**Response:**\n```\n{response}\n```\n\n---\n"
 
-    # Ensure parent directory exists
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    LOG_FILE.write_text(entry + LOG_FILE.read_text() if LOG_FILE.exists() else entry)
+    with _log_lock:
+        f = _open_log()
+        f.write(entry)
+        _pending += 1
+        if _pending >= LOG_FLUSH_EVERY:
+            f.flush()
+            _pending = 0
+
+
+def flush_log():
+    """Write buffered entries to LOG_FILE"""
+    global _pending
+    with _log_lock:
+        if _log_file is not None:
+            _log_file.flush()
+        _pending = 0
+
+
+def close_log():
+    """Flush and close the log file; the next entry reopens it"""
+    global _log_file, _pending
+    with _log_lock:
+        if _log_file is not None:
+            _log_file.close()
+            _log_file = None
+        _pending = 0
+
+
+atexit.register(close_log)
@@ -1,23 +1,130 @@
-import subprocess
+import asyncio
+import http.client
+import json
+import os
+import threading
+from urllib.parse import urlsplit
 
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+# How long Ollama keeps the model (and its cached prompt prefix) loaded
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Context window in tokens; unset uses the model's default. Changing it
+# makes Ollama reload the model, so keep it the same for every request
+OLLAMA_NUM_CTX = os.getenv("OLLAMA_NUM_CTX")
 
-def ollama_llm_streaming(prompt: str):
+# One keep-alive connection to the Ollama server per thread
+_local = threading.local()
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        host = OLLAMA_HOST if "://" in OLLAMA_HOST else f"http://{OLLAMA_HOST}"
+        url = urlsplit(host)
+        if url.scheme == "https":
+            conn = http.client.HTTPSConnection(url.hostname, url.port or 443)
+        else:
+            conn = http.client.HTTPConnection(url.hostname, url.port or 11434)
+        _local.conn = conn
+    return conn
+
+
+def _post(path, payload):
+    """POST a JSON payload to the Ollama server and return the open response"""
+    body = json.dumps(payload)
+    headers = {"Content-Type": "application/json"}
+    conn = _connection()
     try:
-        process = subprocess.Popen(
-            ["ollama", "run", "llama3", prompt],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
+        conn.request("POST", path, body, headers)
+        response = conn.getresponse()
+    except (http.client.HTTPException, OSError):
+        # The server may have dropped the idle connection; reconnect once
+        conn.close()
+        conn.request("POST", path, body, headers)
+        response = conn.getresponse()
+
+    if response.status != 200:
+        detail = response.read().decode(errors="replace")
+        raise RuntimeError(f"HTTP {response.status}: {detail}")
+    return response
+
+
+def _generate(prompt, stream, system=None):
+    """
+    POST a prompt to /api/chat and return the open response
+
+    A fixed system prompt is sent as its own message so it forms the same
+    leading tokens on every call, letting Ollama reuse its cached prefix.
+    Unlike /api/generate, the chat endpoint does not send the whole token
+    context back with the answer.
+    """
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    payload = {
+        "model": OLLAMA_MODEL,
+        "messages": messages,
+        "stream": stream,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+    }
+    if OLLAMA_NUM_CTX:
+        payload["options"] = {"num_ctx": int(OLLAMA_NUM_CTX)}
+    return _post("/api/chat", payload)
+
+
+def _message_text(response):
+    return response.get("message", {}).get("content", "")
+
+
+def _generate_text(prompt, system=None):
+    response = json.loads(_generate(prompt, stream=False, system=system).read())
+    return _message_text(response).strip()
+
+
+def ollama_llm_streaming(prompt: str, system: str = None):
+    try:
+        response = _generate(prompt, stream=True, system=system)
         print("🤖 [Streaming response]: ", end="", flush=True)
         output = []
-        while True:
-            line = process.stdout.readline()
-            if not line:
-                break
-            print(line.strip(), end=" ", flush=True)
-            output.append(line.strip())
+        # Ollama streams one JSON object per line; read to the end so the
+        # connection can be reused
+        for line in response:
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(chunk["error"])
+            token = _message_text(chunk)
+            print(token, end="", flush=True)
+            output.append(token)
         print()
-        return {"text": " ".join(output), "confidence": 0.9}
+        return {"text": "".join(output).strip(), "confidence": 0.9}
+    except Exception as e:
+        return {"text": f"[Ollama error: {e}]", "confidence": 0.0}
+
+
+async def ollama_llm_async(prompt: str, system: str = None):
+    """Run Ollama without blocking the event loop so several prompts can overlap"""
+    try:
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(None, _generate_text, prompt, system)
+        return {"text": text, "confidence": 0.9}
     except Exception as e:
         return {"text": f"[Ollama error: {e}]", "confidence": 0.0}
+
+
+def ollama_embed(text: str):
+    """Embedding vector for text from the Ollama embeddings endpoint"""
+    response = _post("/api/embeddings", {"model": OLLAMA_EMBED_MODEL, "prompt": text})
+    return json.loads(response.read())["embedding"]
+
+
+async def ollama_embed_async(text: str):
+    """Embedding vector for text, or None if Ollama could not embed it"""
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, ollama_embed, text)
+    except Exception:
+        return None
@@ -0,0 +1,274 @@
+"""
+Similarity caches for LLM responses, keyed by embedding vectors
+
+Prompts that miss the exact-match LLM cache are embedded and compared with
+previously answered prompts. A response is reused when the cosine similarity
+is at least SEMANTIC_CACHE_THRESHOLD, which catches near-duplicate emails such
+as recurring newsletters and notifications.
+
+Inbox summaries get their own cache keyed on the set of emails summarized, so
+polling an unchanged (or barely changed) inbox does not rerun the LLM.
+"""
+
+import hashlib
+import math
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from core import json_io
+from core.llm_cache import CACHE_EXPIRY_HOURS, cached_llm_async, lookup
+from core.ollama_llm import ollama_embed, ollama_embed_async
+
+__all__ = [
+    "EMAIL_SET_CACHE_FILE",
+    "SEMANTIC_CACHE_ENABLED",
+    "SEMANTIC_CACHE_FILE",
+    "SEMANTIC_CACHE_THRESHOLD",
+    "SemanticCache",
+    "email_set_cached",
+    "email_set_fingerprint",
+    "find_similar",
+    "remember_embedding",
+    "semantic_cached_llm_async",
+]
+
+# Off by default: a near-duplicate prompt is not guaranteed to need the same answer
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# Inbox summaries older than this are not reused
+EMAIL_SET_CACHE_TTL = int(os.getenv("EMAIL_SET_CACHE_TTL", "3600"))
+# Most entries kept per cache; every similarity lookup scans all of them
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+
+# Use cache directory for cache files
+CACHE_DIR = Path(__file__).parent.parent / "cache"
+CACHE_DIR.mkdir(exist_ok=True)
+SEMANTIC_CACHE_FILE = CACHE_DIR / "semantic_cache.jsonl"
+EMAIL_SET_CACHE_FILE = CACHE_DIR / "email_set_cache.jsonl"
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else None
+
+
+class SemanticCache:
+    """
+    Store of (embedding, response) pairs with similarity lookup
+
+    Entries are appended to a JSONL file. Expired entries and the oldest
+    beyond max_entries are dropped, and the file is rewritten with the
+    remaining entries once it holds twice max_entries lines.
+    """
+
+    def __init__(self, path, threshold=None, ttl=None, max_entries=None):
+        """
+        Args:
+            path: JSONL file the entries are stored in
+            threshold: Minimum cosine similarity for a hit
+                (default: SEMANTIC_CACHE_THRESHOLD)
+            ttl: Seconds an entry stays usable (default: no expiry)
+            max_entries: Most entries kept (default: SEMANTIC_CACHE_SIZE)
+        """
+        self.path = Path(path)
+        self.threshold = SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        self.ttl = ttl
+        self.max_entries = SEMANTIC_CACHE_SIZE if max_entries is None else max_entries
+        self.stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0}
+        self._entries = None
+        self._lines = 0
+        self._lock = threading.Lock()
+
+    def _get_entries(self):
+        if self._entries is None:
+            self._entries = []
+            self._lines = 0
+            if self.path.exists():
+                with self.path.open("rb") as f:
+                    for line in f:
+                        if line.strip():
+                            self._entries.append(json_io.loads(line))
+                            self._lines += 1
+        return self._entries
+
+    def _live_entries(self):
+        """Entries still usable, after dropping expired and excess ones"""
+        entries = self._get_entries()
+        # Entries are appended in time order, so the oldest come first
+        drop = max(0, len(entries) - self.max_entries)
+        if self.ttl is not None:
+            oldest = time.time() - self.ttl
+            while drop < len(entries) and entries[drop].get("time", 0) < oldest:
+                drop += 1
+        del entries[:drop]
+        return entries
+
+    def _rewrite(self):
+        """Replace the file with one line per entry currently kept"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for entry in self._entries:
+                    f.write(json_io.dumps(entry) + b"\n")
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._lines = len(self._entries)
+
+    def reset(self):
+        """Drop the in-memory copy so entries are reloaded from disk"""
+        with self._lock:
+            self._entries = None
+
+    def get(self, key):
+        """Cached response stored under an exact key, if any"""
+        with self._lock:
+            for entry in reversed(self._live_entries()):
+                if entry.get("key") == key:
+                    self.stats["exact_hits"] += 1
+                    return entry["response"]
+        return None
+
+    def find_similar(self, embedding):
+        """Cached response for the most similar embedding above the threshold"""
+        query = _normalize(embedding)
+        if query is None:
+            return None
+
+        best_score, best_response = self.threshold, None
+        with self._lock:
+            for entry in self._live_entries():
+                vector = entry.get("embedding")
+                if not vector:
+                    continue
+                score = sum(a * b for a, b in zip(query, vector))
+                if score >= best_score:
+                    best_score, best_response = score, entry["response"]
+            if best_response is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["similar_hits"] += 1
+        return best_response
+
+    def remember(self, response, embedding=None, key=None):
+        """Store a response under an embedding and/or an exact key"""
+        vector = _normalize(embedding) if embedding else None
+        if vector is None and key is None:
+            return
+        entry = {
+            "key": key,
+            "embedding": vector,
+            "response": response,
+            "time": time.time(),
+        }
+        with self._lock:
+            self._get_entries().append(entry)
+            self._live_entries()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self._lines >= 2 * self.max_entries:
+                self._rewrite()
+            else:
+                with self.path.open("ab") as f:
+                    f.write(json_io.dumps(entry) + b"\n")
+                self._lines += 1
+
+
+# Prompt responses expire with the exact-match LLM cache
+_prompt_cache = SemanticCache(
+    SEMANTIC_CACHE_FILE, ttl=CACHE_EXPIRY_HOURS * 3600 if CACHE_EXPIRY_HOURS else None
+)
+_email_set_cache = SemanticCache(EMAIL_SET_CACHE_FILE, ttl=EMAIL_SET_CACHE_TTL)
+
+
+def find_similar(embedding):
+    """Cached response for the most similar prompt above the threshold, if any"""
+    return _prompt_cache.find_similar(embedding)
+
+
+def remember_embedding(embedding, response):
+    """Add a prompt embedding and its response to the cache"""
+    _prompt_cache.remember(response, embedding=embedding)
+
+
+async def semantic_cached_llm_async(prompt, llm_func, embed_func=ollama_embed_async):
+    """
+    cached_llm_async with a similarity lookup before the LLM is called
+
+    The exact-match cache is checked first. On a miss the prompt is embedded;
+    a similar enough cached prompt supplies the response, otherwise llm_func
+    runs and its response is stored under the prompt and the new embedding.
+    A borrowed response is not stored as an exact entry for the new prompt.
+    If embedding fails the call behaves like cached_llm_async.
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return await cached_llm_async(prompt, llm_func)
+
+    cached = lookup(prompt)
+    if cached is not None:
+        print("🧠 Using cached response.")
+        return cached
+
+    embedding = await embed_func(prompt)
+    if embedding:
+        similar = find_similar(embedding)
+        if similar is not None:
+            print("🧠 Using semantically cached response.")
+            return similar
+
+    result = await cached_llm_async(prompt, llm_func)
+    # Do not spread error responses to other prompts
+    if embedding and result.get("confidence", 0) > 0:
+        remember_embedding(embedding, result)
+    return result
+
+
+def _email_snippet(email):
+    return email.get("snippet") or email.get("content", {}).get("snippet", "")
+
+
+def email_set_fingerprint(emails):
+    """Order-independent hash of the emails' IDs and the start of their snippets"""
+    items = sorted((email.get("id") or "", _email_snippet(email)[:64]) for email in emails)
+    digest = hashlib.sha256()
+    for email_id, snippet in items:
+        digest.update(f"{email_id}\0{snippet}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def email_set_cached(emails, llm_call, embed_func=ollama_embed):
+    """
+    Reuse the response for the same, or a similar, set of emails
+
+    The exact fingerprint of the email set is checked first. Otherwise the
+    emails' subjects and senders are embedded and compared with earlier sets.
+    On a miss llm_call() runs and its response is stored under both keys.
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return llm_call()
+
+    fingerprint = email_set_fingerprint(emails)
+    cached = _email_set_cache.get(fingerprint)
+    if cached is not None:
+        print("🧠 Using cached summary for this set of emails.")
+        return cached
+
+    headline = "\n".join(
+        f"{email.get('subject', '')} | {email.get('sender', '')}" for email in emails
+    )
+    try:
+        embedding = embed_func(headline)
+    except Exception:
+        embedding = None
+    if embedding:
+        similar = _email_set_cache.find_similar(embedding)
+        if similar is not None:
+            print("🧠 Using cached summary for a similar set of emails.")
+            return similar
+
+    result = llm_call()
+    if result.get("confidence", 0) > 0:
+        _email_set_cache.remember(result, embedding=embedding, key=fingerprint)
+    return result
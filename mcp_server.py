@@ -5,8 +5,20 @@ Uses FastMCP Framework for robust Model Context Protocol support
 Provides Gmail reading and email processing tools for Claude Desktop and VS Code
 """
 
+from __future__ import annotations
+
+import asyncio
+import atexit
+import functools
+import html
 import logging
-from typing import List, Optional
+import logging.handlers
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional
 from pathlib import Path
 import sys
 
@@ -14,19 +26,77 @@ import sys
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from fastmcp import FastMCP
-from core.gmail_client import get_gmail_service, test_gmail_connection
+from core.gmail_client import (
+    build_raw_message,
+    get_gmail_service,
+    test_gmail_connection,
+)
 from core.gmail_reader import create_gmail_reader
-from core.email_summarizer import summarize_emails
+from core.email_summarizer import create_email_body, summarize_emails_async
 from core.ollama_llm import ollama_llm_streaming
-from core.llm_cache import cached_llm
+from core.llm_cache import cached_llm_with_prefix
+from core.semantic_cache import email_set_cached
+
+if TYPE_CHECKING:
+    from fastmcp import Context
+
+# Tool functions, registered with the FastMCP app when the server starts so
+# importing this module does not load FastMCP
+_tools = []
+
+# Email payload tools return their result as text content only. With an
+# output schema FastMCP would also serialize it as structured content,
+# sending every email twice
+EMAIL_TOOL_OPTIONS = {"output_schema": None}
+
+
+def tool(func=None, **options):
+    """Mark a function as an MCP tool, with optional FastMCP tool options"""
+    if func is None:
+        return functools.partial(tool, **options)
+    _tools.append((func, options))
+    return func
+
+
+def _init_app():
+    """Create the FastMCP app and register the tools"""
+    # Tool signatures refer to Context; FastMCP resolves it from module globals
+    global Context
+    from fastmcp import Context, FastMCP
+
+    app = FastMCP("Gmail Assistant")
+    for func, options in _tools:
+        app.tool(func, **options)
+    return app
+
+# Fixed instructions for generate_email_summary. Sent as the system prompt so
+# the model sees identical leading tokens on every call; only emails vary
+SUMMARY_INSTRUCTIONS = """Analyze the emails you are given and provide:
+1. A concise overall summary (2-3 sentences)
+2. Key insights (3-5 bullet points)
+3. Action items needed (if any)
+
+Format your response as:
+SUMMARY: [your summary]
+INSIGHTS: [bullet points]
+ACTIONS: [action items if any]"""
 
-# Initialize FastMCP app
-app = FastMCP("Gmail Assistant")
+# Section markers in the summary response, and one stripped item per
+# non-empty line
+_SECTIONS_RE = re.compile(r"(SUMMARY|INSIGHTS|ACTIONS):")
+_LINE_RE = re.compile(r"^[ \t]*(.*\S)", re.MULTILINE)
 
-# Global variables for Gmail service (initialized once)
-gmail_service = None
-gmail_reader = None
+# Recent summarize_emails_tool results by (query, count), so repeated calls
+# within SUMMARY_CACHE_TTL seconds skip the Gmail fetch and the LLM. Entries
+# are kept oldest first and at most SUMMARY_CACHE_SIZE are kept
+SUMMARY_CACHE_TTL = 60
+SUMMARY_CACHE_SIZE = 32
+_summary_cache = {}
+
+# The Gmail service shares one httplib2 connection, which is not thread-safe,
+# so blocking Gmail calls run one at a time on this thread, off the event loop.
+# Every tool is async and makes its Gmail calls through run_gmail_call
+gmail_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gmail")
 
 
 def generate_email_summary(emails):
@@ -42,57 +112,55 @@ def generate_email_summary(emails):
     if not emails:
         return {"summary": "No emails to summarize", "key_insights": [], "action_items": []}
     
-    # Prepare email content for summarization
-    email_content = []
-    for email in emails[:10]:  # Limit to first 10 emails to avoid token limits
-        content = f"From: {email.get('sender', 'Unknown')}\n"
-        content += f"Subject: {email.get('subject', 'No Subject')}\n"
-        content += f"Preview: {email.get('content_preview', '')[:200]}...\n"
-        email_content.append(content)
+    # Prepare email content for summarization, one string per email
+    email_content = [
+        f"From: {email.get('sender', 'Unknown')}\n"
+        f"Subject: {email.get('subject', 'No Subject')}\n"
+        f"Preview: {(email.get('content_preview') or '')[:200]}...\n"
+        for email in emails[:10]  # Limit to first 10 emails to avoid token limits
+    ]
     
-    # Create summarization prompt
+    # Create summarization prompt; variable content goes after the fixed instructions
     combined_emails = "\n---\n".join(email_content)
-    prompt = f"""Analyze these {len(emails)} emails and provide:
-1. A concise overall summary (2-3 sentences)
-2. Key insights (3-5 bullet points)
-3. Action items needed (if any)
-
-Emails:
-{combined_emails}
-
-Format your response as:
-SUMMARY: [your summary]
-INSIGHTS: [bullet points]
-ACTIONS: [action items if any]"""
+    emails_prompt = f"""Emails ({len(emails)}):
+{combined_emails}"""
     
     try:
-        # Use the cached LLM function
-        result = cached_llm(prompt, ollama_llm_streaming)
+        # Use the cached LLM function, reusing summaries of the same or a
+        # similar set of emails when the semantic cache is enabled
+        result = email_set_cached(
+            emails,
+            lambda: cached_llm_with_prefix(
+                SUMMARY_INSTRUCTIONS, emails_prompt, ollama_llm_streaming
+            ),
+        )
         response_text = result.get("text", "Failed to generate summary")
         
         # Parse the response
         summary = "Summary not available"
-        insights = []
-        actions = []
-        
-        if "SUMMARY:" in response_text:
-            summary_part = response_text.split("SUMMARY:")[1].split("INSIGHTS:")[0].strip()
-            summary = summary_part if summary_part else "Summary generated successfully"
         
-        if "INSIGHTS:" in response_text:
-            insights_part = response_text.split("INSIGHTS:")[1].split("ACTIONS:")[0].strip()
-            insights = [line.strip() for line in insights_part.split('\n') if line.strip()]
+        # Split into sections in one pass; the first occurrence of each wins
+        sections = {}
+        parts = _SECTIONS_RE.split(response_text)
+        for name, body in zip(parts[1::2], parts[2::2]):
+            sections.setdefault(name, body.strip())
         
-        if "ACTIONS:" in response_text:
-            actions_part = response_text.split("ACTIONS:")[1].strip()
-            actions = [line.strip() for line in actions_part.split('\n') if line.strip()]
+        if "SUMMARY" in sections:
+            summary = sections["SUMMARY"] or "Summary generated successfully"
+        insights = _LINE_RE.findall(sections.get("INSIGHTS", ""))
+        actions = _LINE_RE.findall(sections.get("ACTIONS", ""))
         
-        return {
+        summary_result = {
             "summary": summary,
             "key_insights": insights,
             "action_items": actions,
             "raw_response": response_text
         }
+        # Failed LLM calls are reported with zero confidence; flag them so
+        # the result is not cached
+        if result.get("confidence", 1) <= 0:
+            summary_result["error"] = response_text
+        return summary_result
         
     except Exception as e:
         return {
@@ -110,134 +178,185 @@ def setup_logging():
     log_dir.mkdir(exist_ok=True)
     log_file = log_dir / "fastmcp_server.log"
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.FileHandler(log_file), logging.StreamHandler()],
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Tool calls only enqueue records; a background thread does the writes
+    log_queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
     )
+    listener.start()
+    atexit.register(listener.stop)
+
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
     return logging.getLogger(__name__)
 
 
 logger = setup_logging()
 
 
+@functools.lru_cache(maxsize=1)
 def ensure_gmail_connection():
-    """Ensure Gmail service is initialized"""
-    global gmail_service, gmail_reader
-
-    if gmail_service is None:
-        try:
-            logger.info("Initializing Gmail service...")
-            gmail_service = get_gmail_service()
-            gmail_reader = create_gmail_reader(service=gmail_service)
-            logger.info("Gmail service initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Gmail service: {e}")
-            raise
+    """
+    Ensure Gmail service is initialized
 
-    return gmail_service, gmail_reader
+    The service and reader are created once and cached; a failed attempt is
+    not cached, so the next call retries. Call ensure_gmail_connection.cache_clear()
+    to rebuild them.
+    """
+    try:
+        logger.info("Initializing Gmail service...")
+        service = get_gmail_service()
+        reader = create_gmail_reader(service=service)
+        logger.info("Gmail service initialized successfully")
+    except Exception as e:
+        logger.error("Failed to initialize Gmail service: %s", e)
+        raise
+
+    return service, reader
+
+
+def _preview(text, limit):
+    """First limit characters of text, with "..." appended if it was cut"""
+    head = text[: limit + 1]
+    return head if len(head) <= limit else head[:limit] + "..."
+
+
+def _simplify(email, preview_len):
+    """Compact email dictionary for Claude Desktop with a shortened text preview"""
+    content = email.get("content") or {}
+    # Emails fetched in metadata format only carry Gmail's snippet
+    text = content.get("text") or html.unescape(content.get("snippet") or "")
+    metadata = email.get("metadata") or {}
+    date = email.get("date")
+    return {
+        "id": email.get("id"),
+        "subject": email.get("subject", "(No Subject)"),
+        "sender": email.get("sender", "(Unknown)"),
+        "date": str(date) if date else "Unknown",
+        "content_preview": _preview(text, preview_len),
+        "is_unread": metadata.get("is_unread", False),
+        "has_attachments": metadata.get("has_attachments", False),
+        "importance": metadata.get("importance", "normal"),
+    }
+
+
+async def report_progress(ctx, progress, total, message, *args):
+    """Log a progress line and pass it on to the MCP client, if it asked for one"""
+    logger.info(message, *args)
+    if ctx is not None:
+        await ctx.report_progress(progress, total)
+
+
+async def run_gmail_call(func, *args, **kwargs):
+    """Run a blocking Gmail call on the Gmail thread without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        gmail_executor, functools.partial(func, *args, **kwargs)
+    )
 
 
-@app.tool
-def read_latest_emails(count: int = 10, query: str = "") -> List[dict]:
+@tool(**EMAIL_TOOL_OPTIONS)
+async def read_latest_emails(
+    count: int = 10, query: str = "", ctx: Optional[Context] = None
+) -> List[dict]:
     """
     Read the latest emails from Gmail inbox
 
     Args:
         count: Number of emails to read (default: 10)
         query: Gmail search query (optional, e.g., 'is:unread', 'from:someone@example.com')
+        ctx: MCP request context, used to report progress (injected by FastMCP)
 
     Returns:
         List of email dictionaries with subject, sender, date, content, etc.
     """
     try:
-        logger.info(f"Reading {count} latest emails with query: '{query}'")
-        service, reader = ensure_gmail_connection()
+        logger.info("Reading %d latest emails with query: '%s'", count, query)
+        service, reader = await run_gmail_call(ensure_gmail_connection)
 
         # Use query parameter if provided, otherwise get latest emails
         search_query = query if query.strip() else None
-        emails = reader.read_emails(count=count, query=search_query)
+        await report_progress(ctx, 0, count, "Fetching up to %d emails", count)
+        # Only previews are returned, so skip downloading message bodies;
+        # _simplify reads fields with get(), so decoding can be lazy
+        emails = await run_gmail_call(
+            reader.read_emails,
+            count=count,
+            query=search_query,
+            format="metadata",
+            lazy=True,
+        )
+        await report_progress(
+            ctx, len(emails), len(emails), "Fetched %d emails", len(emails)
+        )
 
         # Simplify email data for Claude Desktop
-        simplified_emails = []
-        for email in emails:
-            simplified_email = {
-                "id": email.get("id"),
-                "subject": email.get("subject", "(No Subject)"),
-                "sender": email.get("sender", "(Unknown)"),
-                "date": str(email.get("date")) if email.get("date") else "Unknown",
-                "content_preview": (
-                    email.get("content", {}).get("text", "")[:500] + "..."
-                    if len(email.get("content", {}).get("text", "")) > 500
-                    else email.get("content", {}).get("text", "")
-                ),
-                "is_unread": email.get("metadata", {}).get("is_unread", False),
-                "has_attachments": email.get("metadata", {}).get(
-                    "has_attachments", False
-                ),
-                "importance": email.get("metadata", {}).get("importance", "normal"),
-            }
-            simplified_emails.append(simplified_email)
+        simplified_emails = [_simplify(email, 500) for email in emails]
 
-        logger.info(f"Successfully retrieved {len(simplified_emails)} emails")
+        logger.info("Successfully retrieved %d emails", len(simplified_emails))
         return simplified_emails
 
     except Exception as e:
-        logger.error(f"Error reading emails: {e}")
+        logger.error("Error reading emails: %s", e)
         return [{"error": f"Failed to read emails: {str(e)}"}]
 
 
-@app.tool
-def search_emails(query: str, max_results: int = 50) -> List[dict]:
+@tool(**EMAIL_TOOL_OPTIONS)
+async def search_emails(
+    query: str, max_results: int = 50, ctx: Optional[Context] = None
+) -> List[dict]:
     """
     Search emails using Gmail search syntax
 
     Args:
         query: Gmail search query (e.g., 'from:sender@example.com', 'subject:important', 'is:unread')
         max_results: Maximum number of results to return (default: 50)
+        ctx: MCP request context, used to report progress (injected by FastMCP)
 
     Returns:
         List of matching email dictionaries
     """
     try:
         logger.info(
-            f"Searching emails with query: '{query}', max results: {max_results}"
+            "Searching emails with query: '%s', max results: %d", query, max_results
         )
-        service, reader = ensure_gmail_connection()
+        service, reader = await run_gmail_call(ensure_gmail_connection)
 
-        emails = reader.search_emails(query=query, max_results=max_results)
+        await report_progress(
+            ctx, 0, max_results, "Fetching up to %d matching emails", max_results
+        )
+        emails = await run_gmail_call(
+            reader.search_emails,
+            query=query,
+            max_results=max_results,
+            format="metadata",
+            lazy=True,
+        )
+        await report_progress(
+            ctx, len(emails), len(emails), "Fetched %d emails", len(emails)
+        )
 
         # Simplify email data for Claude Desktop
-        simplified_emails = []
-        for email in emails:
-            simplified_email = {
-                "id": email.get("id"),
-                "subject": email.get("subject", "(No Subject)"),
-                "sender": email.get("sender", "(Unknown)"),
-                "date": str(email.get("date")) if email.get("date") else "Unknown",
-                "content_preview": (
-                    email.get("content", {}).get("text", "")[:300] + "..."
-                    if len(email.get("content", {}).get("text", "")) > 300
-                    else email.get("content", {}).get("text", "")
-                ),
-                "is_unread": email.get("metadata", {}).get("is_unread", False),
-                "has_attachments": email.get("metadata", {}).get(
-                    "has_attachments", False
-                ),
-                "importance": email.get("metadata", {}).get("importance", "normal"),
-            }
-            simplified_emails.append(simplified_email)
+        simplified_emails = [_simplify(email, 300) for email in emails]
 
-        logger.info(f"Found {len(simplified_emails)} emails matching query")
+        logger.info("Found %d emails matching query", len(simplified_emails))
         return simplified_emails
 
     except Exception as e:
-        logger.error(f"Error searching emails: {e}")
+        logger.error("Error searching emails: %s", e)
         return [{"error": f"Failed to search emails: {str(e)}"}]
 
 
-@app.tool
-def get_email_details(email_id: str) -> dict:
+@tool(**EMAIL_TOOL_OPTIONS)
+async def get_email_details(email_id: str) -> dict:
     """
     Get full details of a specific email by ID
 
@@ -248,10 +367,10 @@ def get_email_details(email_id: str) -> dict:
         Complete email details including full content, attachments, etc.
     """
     try:
-        logger.info(f"Getting details for email ID: {email_id}")
-        service, reader = ensure_gmail_connection()
+        logger.info("Getting details for email ID: %s", email_id)
+        service, reader = await run_gmail_call(ensure_gmail_connection)
 
-        email = reader.read_email_by_id(email_id)
+        email = await run_gmail_call(reader.read_email_by_id, email_id)
 
         if not email:
             return {"error": f"Email with ID {email_id} not found"}
@@ -275,16 +394,73 @@ def get_email_details(email_id: str) -> dict:
             "importance": email.get("metadata", {}).get("importance", "normal"),
         }
 
-        logger.info(f"Successfully retrieved email details for {email_id}")
+        logger.info("Successfully retrieved email details for %s", email_id)
         return detailed_email
 
     except Exception as e:
-        logger.error(f"Error getting email details: {e}")
+        logger.error("Error getting email details: %s", e)
         return {"error": f"Failed to get email details: {str(e)}"}
 
 
-@app.tool
-def summarize_emails_tool(count: int = 20, query: str = "is:unread") -> dict:
+async def get_or_compute_summary(query, count):
+    """Summary of the emails matching query, reused for SUMMARY_CACHE_TTL seconds"""
+    key = (query, count)
+    cached = _summary_cache.get(key)
+    if cached is not None:
+        age = time.monotonic() - cached[0]
+        if age < SUMMARY_CACHE_TTL:
+            logger.info("Using summary generated %.0fs ago", age)
+            return cached[1]
+        del _summary_cache[key]
+
+    service, reader = await run_gmail_call(ensure_gmail_connection)
+
+    # Get emails to summarize
+    # The summary prompt reads fields with get(), so decoding can be lazy
+    emails = await run_gmail_call(
+        reader.read_emails, count=count, query=query, lazy=True
+    )
+
+    if not emails:
+        return {"summary": "No emails found matching the criteria", "count": 0}
+
+    # Generate summary using AI; the LLM call blocks, so it runs in the
+    # default executor rather than on the event loop
+    loop = asyncio.get_running_loop()
+    summary_result = await loop.run_in_executor(None, generate_email_summary, emails)
+
+    result = {
+        "summary": summary_result.get("summary", "Failed to generate summary"),
+        "count": len(emails),
+        "query_used": query,
+        "key_insights": summary_result.get("key_insights", []),
+        "action_items": summary_result.get("action_items", []),
+    }
+
+    logger.info("Successfully generated summary for %d emails", len(emails))
+    if "error" not in summary_result:
+        _remember_summary(key, result)
+    return result
+
+
+def _remember_summary(key, result):
+    now = time.monotonic()
+    # Re-insert so the entry moves to the end, keeping the dict oldest first
+    _summary_cache.pop(key, None)
+    _summary_cache[key] = (now, result)
+    # Drop expired entries and any beyond the size limit, oldest first
+    while _summary_cache:
+        oldest = next(iter(_summary_cache))
+        if (
+            len(_summary_cache) <= SUMMARY_CACHE_SIZE
+            and now - _summary_cache[oldest][0] < SUMMARY_CACHE_TTL
+        ):
+            break
+        del _summary_cache[oldest]
+
+
+@tool
+async def summarize_emails_tool(count: int = 20, query: str = "is:unread") -> dict:
     """
     Generate a summary of emails using AI
 
@@ -296,36 +472,16 @@ def summarize_emails_tool(count: int = 20, query: str = "is:unread") -> dict:
         AI-generated summary of the emails
     """
     try:
-        logger.info(f"Generating summary for {count} emails with query: '{query}'")
-        service, reader = ensure_gmail_connection()
-
-        # Get emails to summarize
-        emails = reader.read_emails(count=count, query=query)
-
-        if not emails:
-            return {"summary": "No emails found matching the criteria", "count": 0}
-
-        # Generate summary using AI
-        summary_result = generate_email_summary(emails)
-
-        result = {
-            "summary": summary_result.get("summary", "Failed to generate summary"),
-            "count": len(emails),
-            "query_used": query,
-            "key_insights": summary_result.get("key_insights", []),
-            "action_items": summary_result.get("action_items", []),
-        }
-
-        logger.info(f"Successfully generated summary for {len(emails)} emails")
-        return result
+        logger.info("Generating summary for %d emails with query: '%s'", count, query)
+        return await get_or_compute_summary(query, count)
 
     except Exception as e:
-        logger.error(f"Error generating email summary: {e}")
+        logger.error("Error generating email summary: %s", e)
         return {"error": f"Failed to generate summary: {str(e)}", "count": 0}
 
 
-@app.tool
-def test_gmail_connection_tool() -> dict:
+@tool
+async def test_gmail_connection_tool() -> dict:
     """
     Test the Gmail API connection and return status
 
@@ -336,11 +492,11 @@ def test_gmail_connection_tool() -> dict:
         logger.info("Testing Gmail connection...")
 
         # Test connection
-        connection_result = test_gmail_connection()
+        connection_result = await run_gmail_call(test_gmail_connection)
 
         if connection_result.get("success", False):
             # Get basic account info
-            service, reader = ensure_gmail_connection()
+            service, reader = await run_gmail_call(ensure_gmail_connection)
 
             result = {
                 "status": "connected",
@@ -356,11 +512,11 @@ def test_gmail_connection_tool() -> dict:
                 "message": connection_result.get("error", "Unknown connection error"),
             }
 
-        logger.info(f"Gmail connection test result: {result['status']}")
+        logger.info("Gmail connection test result: %s", result["status"])
         return result
 
     except Exception as e:
-        logger.error(f"Error testing Gmail connection: {e}")
+        logger.error("Error testing Gmail connection: %s", e)
         return {
             "status": "error",
             "success": False,
@@ -368,8 +524,8 @@ def test_gmail_connection_tool() -> dict:
         }
 
 
-@app.tool
-def send_email_summary(recipient_email: str = "me", max_emails: int = 10) -> dict:
+@tool
+async def send_email_summary(recipient_email: str = "me", max_emails: int = 10) -> dict:
     """
     Generate and send an AI-powered email summary to a specified recipient
 
@@ -381,18 +537,14 @@ def send_email_summary(recipient_email: str = "me", max_emails: int = 10) -> dic
         Status of the email summary operation
     """
     try:
-        logger.info(f"Generating and sending email summary to: {recipient_email}")
-
-        # Import required modules for email sending
-        from email.mime.text import MIMEText
-        import base64
-        from datetime import datetime
+        logger.info("Generating and sending email summary to: %s", recipient_email)
 
         # Get Gmail service
-        service, reader = ensure_gmail_connection()
+        service, reader = await run_gmail_call(ensure_gmail_connection)
 
-        # Generate summaries using existing functionality
-        summaries = summarize_emails()
+        # Generate summaries using existing functionality; only the Ollama
+        # requests run on the event loop
+        summaries = await summarize_emails_async(gmail_executor)
 
         if not summaries:
             logger.info("No new unread emails to summarize")
@@ -407,40 +559,28 @@ def send_email_summary(recipient_email: str = "me", max_emails: int = 10) -> dic
         summaries = summaries[:max_emails]
 
         # Create email body with formatted summaries
-        def create_email_body(summaries):
-            lines = []
-            for subject, summary in summaries:
-                lines.append(f"🧾 *{subject}*\n{summary}\n")
-            return "\n---\n\n".join(lines)
-
         body = create_email_body(summaries)
-        today = datetime.now().strftime("%Y-%m-%d")
+        # One clock read and one strftime serve both the subject and the footer
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        today = timestamp[:10]
         subject = f"📬 Daily Email Summary – {today}"
 
-        # Add header with summary count
+        # Add header with summary count and footer in one concatenation
         header = f"📊 Summary of {len(summaries)} unread emails:\n\n"
-        body = header + body
+        footer = f"\n\n---\n📤 Generated by FastMCP Gmail Assistant at {timestamp}"
+        body = "".join((header, body, footer))
 
-        # Add footer
-        footer = f"\n\n---\n📤 Generated by FastMCP Gmail Assistant at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        body = body + footer
-
-        # Create and send email
-        message = MIMEText(body)
-        message["to"] = recipient_email
-        message["from"] = "me"
-        message["subject"] = subject
-
-        # Encode message
-        raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
+        # Create and encode the email
+        raw = build_raw_message(recipient_email, subject, body)
 
         # Send email
-        result = (
-            service.users().messages().send(userId="me", body={"raw": raw}).execute()
-        )
+        request = service.users().messages().send(userId="me", body={"raw": raw})
+        result = await run_gmail_call(request.execute)
 
         logger.info(
-            f"Successfully sent email summary with {len(summaries)} emails to {recipient_email}"
+            "Successfully sent email summary with %d emails to %s",
+            len(summaries),
+            recipient_email,
         )
 
         return {
@@ -454,7 +594,7 @@ def send_email_summary(recipient_email: str = "me", max_emails: int = 10) -> dic
         }
 
     except Exception as e:
-        logger.error(f"Error sending email summary: {e}")
+        logger.error("Error sending email summary: %s", e)
         return {
             "success": False,
             "message": f"Failed to send email summary: {str(e)}",
@@ -471,8 +611,9 @@ if __name__ == "__main__":
         ensure_gmail_connection()
         logger.info("Gmail service pre-initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to pre-initialize Gmail service: {e}")
+        logger.error("Failed to pre-initialize Gmail service: %s", e)
         logger.warning("Gmail service will be initialized on first tool call")
 
     # Run the FastMCP server
+    app = _init_app()
     app.run()
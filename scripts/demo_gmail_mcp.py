@@ -104,12 +104,12 @@ def demo_advanced_features():
     try:
         reader = create_gmail_reader(logger=logger)
 
-        # Search with different queries
+        # Search with different queries, batched into shared Gmail requests
         queries = ["from:noreply", "has:attachment", "is:important", "newer_than:7d"]
+        results_by_query = reader.search_many(queries, max_results=2)
 
-        for query in queries:
+        for query, results in results_by_query.items():
             print(f"\n🔍 Search: {query}")
-            results = reader.search_emails(query, max_results=2)
             print(f"   Found {len(results)} emails")
 
             for email_data in results:
@@ -123,24 +123,18 @@ def demo_advanced_features():
         print(f"\n📄 Content Type Analysis")
         emails = reader.read_emails(count=10)
 
-        content_stats = {
-            "text_only": 0,
-            "html_only": 0,
-            "multipart": 0,
-            "with_attachments": 0,
-        }
+        # Count emails by (has text, has HTML) in one pass, indexed as a bitmask
+        content_types = [None, "text_only", "html_only", "multipart"]
+        type_counts = [0] * len(content_types)
+        with_attachments = 0
 
         for email_data in emails:
             content = email_data["content"]
-            if content["html"] and not content["text"]:
-                content_stats["html_only"] += 1
-            elif content["text"] and not content["html"]:
-                content_stats["text_only"] += 1
-            elif content["text"] and content["html"]:
-                content_stats["multipart"] += 1
-
-            if email_data["attachments"]:
-                content_stats["with_attachments"] += 1
+            type_counts[bool(content["text"]) | bool(content["html"]) << 1] += 1
+            with_attachments += bool(email_data["attachments"])
+
+        content_stats = dict(zip(content_types[1:], type_counts[1:]))
+        content_stats["with_attachments"] = with_attachments
 
         print(f"   📊 Analysis of {len(emails)} emails:")
         for stat_type, count in content_stats.items():
@@ -3,13 +3,30 @@
 Setup FastMCP Gmail server for Claude Desktop
 """
 
+import functools
 import json
 import os
 from pathlib import Path
 import sys
 import platform
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
 
+
+@functools.lru_cache(maxsize=1)
+def _project_path():
+    return Path(__file__).parent.parent.absolute()
+
+
+@functools.lru_cache(maxsize=1)
+def _venv_python():
+    return _project_path() / ".venv" / "bin" / "python"
+
+
+@functools.lru_cache(maxsize=1)
 def find_claude_config_path():
     """Find Claude Desktop configuration file path"""
     system = platform.system()
@@ -36,22 +53,30 @@ def setup_claude_desktop():
     """Set up FastMCP Gmail server in Claude Desktop"""
 
     # Get project path
-    project_path = Path(__file__).parent.parent.absolute()
+    project_path = _project_path()
     mcp_server_path = project_path / "mcp_server.py"
 
     # Find Claude Desktop config
     config_path = find_claude_config_path()
 
-    print(f"🖥️  FastMCP Gmail - Claude Desktop Setup")
-    print(f"========================================")
-    print(f"Project path: {project_path}")
-    print(f"Claude config: {config_path}")
-    print()
+    print(
+        "\n".join(
+            [
+                "🖥️  FastMCP Gmail - Claude Desktop Setup",
+                "========================================",
+                f"Project path: {project_path}",
+                f"Claude config: {config_path}",
+                "",
+            ]
+        )
+    )
 
     # Check if mcp_server.py exists (FastMCP implementation)
     if not mcp_server_path.exists():
-        print(f"❌ FastMCP server not found: {mcp_server_path}")
-        print(f"   Make sure you're running this from the project directory")
+        print(
+            f"❌ FastMCP server not found: {mcp_server_path}\n"
+            "   Make sure you're running this from the project directory"
+        )
         return False
 
     # Create config directory if needed
@@ -60,8 +85,9 @@ def setup_claude_desktop():
     # Read existing config or create new one
     if config_path.exists():
         try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
+            data = config_path.read_bytes()
+            config = orjson.loads(data) if orjson is not None else json.loads(data)
+        # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
         except json.JSONDecodeError:
             print(f"⚠️  Invalid JSON in {config_path}, creating backup...")
             backup_path = config_path.with_suffix(".json.backup")
@@ -75,10 +101,12 @@ def setup_claude_desktop():
         config["mcpServers"] = {}
 
     # Add FastMCP Gmail server - use virtual environment Python
-    venv_python = project_path / ".venv" / "bin" / "python"
+    venv_python = _venv_python()
     if not venv_python.exists():
-        print(f"⚠️  Virtual environment not found at {venv_python}")
-        print(f"   Please run 'make setup' first to create the virtual environment")
+        print(
+            f"⚠️  Virtual environment not found at {venv_python}\n"
+            "   Please run 'make setup' first to create the virtual environment"
+        )
         return False
 
     server_config = {
@@ -89,28 +117,33 @@ def setup_claude_desktop():
 
     config["mcpServers"]["fastmcp-gmail"] = server_config
 
-    # Write config back
+    # Write config back in one write to a temporary file, then swap it in so
+    # an interrupted run cannot leave Claude Desktop with a truncated config
     try:
-        with open(config_path, "w") as f:
-            json.dump(config, f, indent=2)
-
-        print(f"✅ FastMCP Gmail server added to Claude Desktop config")
-        print(f"   Config file: {config_path}")
-        print()
-        print(f"🔧 Server Configuration:")
-        print(f"   Name: fastmcp-gmail")
-        print(f"   Command: {venv_python}")
-        print(f"   Script: {mcp_server_path}")
-        print()
-        print(f"🎯 Next Steps:")
-        print(f"   1. Restart Claude Desktop")
-        print(f"   2. Look for Gmail tools in Claude's tool panel")
-        print(f"   3. Test with: 'What are my latest emails?'")
-        print()
-        print(f"🆘 Troubleshooting:")
-        print(f"   - Check server logs: tail -f {project_path}/logs/fastmcp_server.log")
-        print(f"   - Test manually: {venv_python} {mcp_server_path}")
-        print(f"   - Verify Gmail: make test-gmail")
+        tmp_path = config_path.with_name(config_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(config, indent=2))
+        os.replace(tmp_path, config_path)
+
+        lines = [
+            "✅ FastMCP Gmail server added to Claude Desktop config",
+            f"   Config file: {config_path}",
+            "",
+            "🔧 Server Configuration:",
+            "   Name: fastmcp-gmail",
+            f"   Command: {venv_python}",
+            f"   Script: {mcp_server_path}",
+            "",
+            "🎯 Next Steps:",
+            "   1. Restart Claude Desktop",
+            "   2. Look for Gmail tools in Claude's tool panel",
+            "   3. Test with: 'What are my latest emails?'",
+            "",
+            "🆘 Troubleshooting:",
+            f"   - Check server logs: tail -f {project_path}/logs/fastmcp_server.log",
+            f"   - Test manually: {venv_python} {mcp_server_path}",
+            "   - Verify Gmail: make test-gmail",
+        ]
+        print("\n".join(lines))
 
         return True
 
@@ -4,11 +4,33 @@ FastMCP Gmail Configuration Setup
 Helps set up centralized configuration in ~/.local/fastmcp_gmail/
 """
 
+import errno
 import os
 import shutil
 from pathlib import Path
 import sys
 
+# Written as fastmcp_gmail.env when the project has no .env.local
+ENV_TEMPLATE = b"""# FastMCP Gmail Configuration
+# This file is loaded from ~/.local/fastmcp_gmail/fastmcp_gmail.env
+
+# Gmail API Configuration
+GMAIL_CREDENTIALS_FILE=credentials.json
+GMAIL_TOKEN_FILE=token.json
+GMAIL_SCOPES=https://www.googleapis.com/auth/gmail.modify
+
+# Logging Configuration
+LOG_LEVEL=INFO
+
+# LLM Configuration
+LLM_CONFIDENCE_THRESHOLD=0.85
+
+# Email Processing Configuration
+MAX_EMAILS_PER_REQUEST=50
+DEFAULT_EMAIL_COUNT=10
+INCLUDE_SPAM_TRASH=false
+"""
+
 
 def setup_user_config():
     """Set up centralized user configuration directory"""
@@ -47,8 +69,14 @@ def setup_user_config():
 
         if project_file.exists():
             if not config_file.exists():
-                # Move file to config directory
-                shutil.move(str(project_file), str(config_file))
+                # Move file to config directory; a plain rename unless the
+                # config directory is on another filesystem
+                try:
+                    os.rename(project_file, config_file)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.move(str(project_file), str(config_file))
                 print(f"📁 Moved {description}: {project_file} → {config_file}")
                 moved_files.append(filename)
             else:
@@ -60,26 +88,7 @@ def setup_user_config():
                 # Create template/placeholder
                 if filename == ".env.local":
                     # Create environment template
-                    env_content = """# FastMCP Gmail Configuration
-# This file is loaded from ~/.local/fastmcp_gmail/fastmcp_gmail.env
-
-# Gmail API Configuration
-GMAIL_CREDENTIALS_FILE=credentials.json
-GMAIL_TOKEN_FILE=token.json
-GMAIL_SCOPES=https://www.googleapis.com/auth/gmail.modify
-
-# Logging Configuration
-LOG_LEVEL=INFO
-
-# LLM Configuration
-LLM_CONFIDENCE_THRESHOLD=0.85
-
-# Email Processing Configuration
-MAX_EMAILS_PER_REQUEST=50
-DEFAULT_EMAIL_COUNT=10
-INCLUDE_SPAM_TRASH=false
-"""
-                    config_file.write_text(env_content)
+                    config_file.write_bytes(ENV_TEMPLATE)
                     print(f"📝 Created environment template: {config_file}")
                     created_files.append("fastmcp_gmail.env")
                 else:
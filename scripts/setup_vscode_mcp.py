@@ -3,24 +3,107 @@
 Setup FastMCP Gmail server for VS Code
 """
 
+import functools
 import json
 import os
 from pathlib import Path
 import sys
 import platform
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+# Setup instructions, filled in with format_map() once the paths are known
+VSCODE_INSTRUCTIONS = """\
+✅ Found MCP server: {mcp_server_path}
+✅ Found Python environment: {venv_python}
+
+📦 Option 1: Continue Extension (Recommended)
+============================================
+1. Install the Continue extension:
+   - Open VS Code Extensions (Ctrl+Shift+X)
+   - Search for 'Continue'
+   - Install 'Continue - open-source AI code assistant'
+
+2. Configure Continue with MCP server:
+   Add this to your Continue config at: {continue_config_path}
+   ```json
+   {continue_config_json}
+   ```
+
+📦 Option 2: Cline Extension
+============================
+1. Install the Cline extension:
+   - Search for 'Cline' in VS Code Extensions
+   - Install 'Cline' by saoudrizwan
+
+2. Cline automatically supports MCP servers
+   - Use Command Palette: 'Cline: Add MCP Server'
+   - Add server with command: {venv_python}
+   - Args: {mcp_server_path}
+
+🔧 Option 3: Manual Testing
+===========================
+Test the MCP server directly in VS Code terminal:
+```bash
+cd {project_path}
+
+# Test connection
+echo '{{"method":"tools/list","jsonrpc":"2.0","id":1}}' | {venv_python} {mcp_server_path}
+
+# Test Gmail connection
+echo '{{"method":"tools/call","params":{{"name":"test_gmail_connection","arguments":{{}}}},"jsonrpc":"2.0","id":2}}' | {venv_python} {mcp_server_path}
+
+# Read latest emails
+echo '{{"method":"tools/call","params":{{"name":"read_latest_emails","arguments":{{"count":2}}}},"jsonrpc":"2.0","id":3}}' | {venv_python} {mcp_server_path}
+```
+
+🤖 Option 4: GitHub Copilot with MCP Extensions
+===============================================
+Install MCP-compatible extensions:
+- 'Copilot MCP' by automatalabs
+- 'MCP-Client' by m1self
+- 'VSCode MCP Server' by semanticworkbenchteam
+
+"""
+
+
+@functools.lru_cache(maxsize=1)
+def _project_path():
+    return Path(__file__).parent.parent.absolute()
+
+
+@functools.lru_cache(maxsize=1)
+def _venv_python():
+    return _project_path() / ".venv" / "bin" / "python"
+
+
+def _config_json(config):
+    """Config rendered as indented JSON for the user to copy"""
+    if orjson is not None:
+        return orjson.dumps(config, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(config, indent=2)
+
 
 def setup_vscode_mcp():
     """Set up FastMCP Gmail server for VS Code"""
 
     # Get project path
-    project_path = Path(__file__).parent.parent.absolute()
+    project_path = _project_path()
     mcp_server_path = project_path / "mcp_server.py"
 
-    print(f"🖥️  FastMCP Gmail - VS Code Setup")
-    print(f"================================")
-    print(f"Project path: {project_path}")
-    print()
+    print(
+        "\n".join(
+            [
+                "🖥️  FastMCP Gmail - VS Code Setup",
+                "================================",
+                f"Project path: {project_path}",
+                "",
+            ]
+        )
+    )
 
     # Check if mcp_server.py exists (FastMCP implementation)
     if not mcp_server_path.exists():
@@ -28,26 +111,14 @@ def setup_vscode_mcp():
         return False
 
     # Check virtual environment
-    venv_python = project_path / ".venv" / "bin" / "python"
+    venv_python = _venv_python()
     if not venv_python.exists():
-        print(f"⚠️  Virtual environment not found at {venv_python}")
-        print(f"   Please run 'make setup' first to create the virtual environment")
+        print(
+            f"⚠️  Virtual environment not found at {venv_python}\n"
+            "   Please run 'make setup' first to create the virtual environment"
+        )
         return False
 
-    print(f"✅ Found MCP server: {mcp_server_path}")
-    print(f"✅ Found Python environment: {venv_python}")
-    print()
-
-    # Option 1: Continue Extension
-    print(f"📦 Option 1: Continue Extension (Recommended)")
-    print(f"============================================")
-    print(f"1. Install the Continue extension:")
-    print(f"   - Open VS Code Extensions (Ctrl+Shift+X)")
-    print(f"   - Search for 'Continue'")
-    print(f"   - Install 'Continue - open-source AI code assistant'")
-    print()
-    print(f"2. Configure Continue with MCP server:")
-
     # Create Continue config
     continue_config = {
         "models": [
@@ -70,57 +141,18 @@ def setup_vscode_mcp():
     # Find Continue config path
     continue_config_path = Path.home() / ".continue" / "config.json"
 
-    print(f"   Add this to your Continue config at: {continue_config_path}")
-    print(f"   ```json")
-    print(f"   {json.dumps(continue_config, indent=2)}")
-    print(f"   ```")
-    print()
-
-    # Option 2: Cline Extension
-    print(f"📦 Option 2: Cline Extension")
-    print(f"============================")
-    print(f"1. Install the Cline extension:")
-    print(f"   - Search for 'Cline' in VS Code Extensions")
-    print(f"   - Install 'Cline' by saoudrizwan")
-    print()
-    print(f"2. Cline automatically supports MCP servers")
-    print(f"   - Use Command Palette: 'Cline: Add MCP Server'")
-    print(f"   - Add server with command: {venv_python}")
-    print(f"   - Args: {mcp_server_path}")
-    print()
-
-    # Option 3: Manual MCP testing
-    print(f"🔧 Option 3: Manual Testing")
-    print(f"===========================")
-    print(f"Test the MCP server directly in VS Code terminal:")
-    print(f"```bash")
-    print(f"cd {project_path}")
-    print(f"")
-    print(f"# Test connection")
-    print(
-        f'echo \'{{"method":"tools/list","jsonrpc":"2.0","id":1}}\' | {venv_python} {mcp_server_path}'
-    )
-    print(f"")
-    print(f"# Test Gmail connection")
-    print(
-        f'echo \'{{"method":"tools/call","params":{{"name":"test_gmail_connection","arguments":{{}}}},"jsonrpc":"2.0","id":2}}\' | {venv_python} {mcp_server_path}'
-    )
-    print(f"")
-    print(f"# Read latest emails")
     print(
-        f'echo \'{{"method":"tools/call","params":{{"name":"read_latest_emails","arguments":{{"count":2}}}},"jsonrpc":"2.0","id":3}}\' | {venv_python} {mcp_server_path}'
+        VSCODE_INSTRUCTIONS.format_map(
+            {
+                "project_path": project_path,
+                "mcp_server_path": mcp_server_path,
+                "venv_python": venv_python,
+                "continue_config_path": continue_config_path,
+                "continue_config_json": _config_json(continue_config),
+            }
+        ),
+        end="",
     )
-    print(f"```")
-    print()
-
-    # Option 4: GitHub Copilot Chat with MCP
-    print(f"🤖 Option 4: GitHub Copilot with MCP Extensions")
-    print(f"===============================================")
-    print(f"Install MCP-compatible extensions:")
-    print(f"- 'Copilot MCP' by automatalabs")
-    print(f"- 'MCP-Client' by m1self")
-    print(f"- 'VSCode MCP Server' by semanticworkbenchteam")
-    print()
 
     # Write a simple launcher script
     launcher_script = project_path / "run_mcp_server.sh"
@@ -136,13 +168,19 @@ cd "{project_path}"
     # Make executable
     os.chmod(launcher_script, 0o755)
 
-    print(f"✅ Created launcher script: {launcher_script}")
-    print()
-    print(f"🎯 Quick Start Commands:")
-    print(f"   - Test server: ./run_mcp_server.sh")
-    print(f"   - Check Gmail: make test-gmail")
-    print(f"   - View logs: tail -f logs/fastmcp_server.log")
-    print()
+    print(
+        "\n".join(
+            [
+                f"✅ Created launcher script: {launcher_script}",
+                "",
+                "🎯 Quick Start Commands:",
+                "   - Test server: ./run_mcp_server.sh",
+                "   - Check Gmail: make test-gmail",
+                "   - View logs: tail -f logs/fastmcp_server.log",
+                "",
+            ]
+        )
+    )
 
     return True
 
@@ -1,17 +1,8 @@
-from core.email_summarizer import summarize_emails
-from core.gmail_client import get_gmail_service
-from email.mime.text import MIMEText
-import base64
+from core.email_summarizer import create_email_body, summarize_emails
+from core.gmail_client import build_raw_message, get_gmail_service
 from datetime import datetime
 
 
-def create_email_body(summaries):
-    lines = []
-    for subject, summary in summaries:
-        lines.append(f"🧾 *{subject}*\n{summary}\n")
-    return "\n---\n\n".join(lines)
-
-
 def send_summary_email():
     summaries = summarize_emails()
     if not summaries:
@@ -20,11 +11,7 @@ def send_summary_email():
     body = create_email_body(summaries)
     today = datetime.now().strftime("%Y-%m-%d")
     subject = f"📬 Daily Email Summary – {today}"
-    message = MIMEText(body)
-    message["to"] = "me"
-    message["from"] = "me"
-    message["subject"] = subject
-    raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
+    raw = build_raw_message("me", subject, body)
     service = get_gmail_service()
     service.users().messages().send(userId="me", body={"raw": raw}).execute()
     print(f"✅ Sent summary email for {len(summaries)} message(s).")
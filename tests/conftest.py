@@ -0,0 +1,70 @@
+"""
+Shared pytest fixtures
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make the project packages importable from every test module
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_cache_dirs(tmp_path_factory):
+    """Point the cache and log files at one temporary tree for the whole session
+
+    Tests never touch the project's own cache/ and logs/ directories, and the
+    tree is created once rather than per test.
+    """
+    from core import email_summarizer, gmail_reader, llm_cache, llm_log, semantic_cache
+
+    base = tmp_path_factory.mktemp("project")
+    cache_dir = base / "cache"
+    logs_dir = base / "logs"
+    cache_dir.mkdir()
+    logs_dir.mkdir()
+
+    semantic_caches = (semantic_cache._prompt_cache, semantic_cache._email_set_cache)
+    message_cache = gmail_reader._message_cache
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(llm_cache, "CACHE_FILE", cache_dir / llm_cache.CACHE_FILE.name)
+        mp.setattr(llm_cache, "JOURNAL_FILE", cache_dir / llm_cache.JOURNAL_FILE.name)
+        mp.setattr(llm_cache, "_memory_cache", None)
+        mp.setattr(email_summarizer, "CACHE_FILE", cache_dir / email_summarizer.CACHE_FILE.name)
+        mp.setattr(
+            email_summarizer,
+            "JOURNAL_FILE",
+            cache_dir / email_summarizer.JOURNAL_FILE.name,
+        )
+        mp.setattr(llm_log, "LOG_FILE", logs_dir / llm_log.LOG_FILE.name)
+        for cache in semantic_caches:
+            mp.setattr(cache, "path", cache_dir / cache.path.name)
+            cache.reset()
+        mp.setattr(message_cache, "path", cache_dir / message_cache.path.name)
+        message_cache.reset()
+        yield base
+        llm_log.close_log()
+
+    # Drop test entries so the exit-time compaction cannot write them out
+    llm_cache.reset()
+    for cache in semantic_caches:
+        cache.reset()
+
+
+@pytest.fixture(scope="session")
+def gmail_service():
+    """Shared Gmail service for tests that call the real API
+
+    Authentication is attempted once per session; without credentials every
+    test using the fixture is skipped.
+    """
+    from core.gmail_client import get_gmail_service
+
+    try:
+        return get_gmail_service()
+    except Exception as e:
+        pytest.skip(f"Gmail authentication not available: {e}")
@@ -0,0 +1,99 @@
+"""
+Lightweight fake of the Gmail API service for reader tests
+
+Only the calls GmailReader makes are implemented: users().messages().list,
+users().messages().get and new_batch_http_request. Messages come from a plain
+dictionary keyed by message ID; list ignores the search query.
+"""
+
+
+class FakeRequest:
+    """Prepared API request returning a fixed response"""
+
+    __slots__ = ("_response",)
+
+    def __init__(self, response):
+        self._response = response
+
+    def execute(self):
+        if isinstance(self._response, Exception):
+            raise self._response
+        return self._response
+
+
+class FakeBatch:
+    """Batch request that runs queued requests and reports to the callback"""
+
+    __slots__ = ("_callback", "_requests")
+
+    def __init__(self, callback):
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, request_id=None):
+        self._requests.append((request_id, request))
+
+    def execute(self):
+        for request_id, request in self._requests:
+            try:
+                response = request.execute()
+            except Exception as e:
+                self._callback(request_id, None, e)
+            else:
+                self._callback(request_id, response, None)
+
+
+class FakeMessages:
+    """users().messages() resource backed by a dictionary of messages"""
+
+    __slots__ = ("messages_db", "get_calls")
+
+    def __init__(self, messages_db):
+        self.messages_db = messages_db
+        # Keyword arguments of every get() call, in order
+        self.get_calls = []
+
+    def list(self, userId, maxResults=100, **kwargs):
+        ids = list(self.messages_db)[:maxResults]
+        return FakeRequest({"messages": [{"id": msg_id} for msg_id in ids]})
+
+    def get(self, userId, id, **kwargs):
+        self.get_calls.append({"id": id, **kwargs})
+        message = self.messages_db.get(id)
+        if message is None:
+            return FakeRequest(LookupError(f"Message {id} not found"))
+        return FakeRequest(message)
+
+
+class FakeUsers:
+    """users() resource"""
+
+    __slots__ = ("_messages",)
+
+    def __init__(self, messages):
+        self._messages = messages
+
+    def messages(self):
+        return self._messages
+
+
+class FakeGmailService:
+    """Stand-in for the googleapiclient Gmail service"""
+
+    __slots__ = ("messages", "batch_count", "_users")
+
+    def __init__(self, messages_db):
+        """
+        Args:
+            messages_db: Dictionary mapping message ID to message resource
+        """
+        self.messages = FakeMessages(messages_db)
+        self.batch_count = 0
+        self._users = FakeUsers(self.messages)
+
+    def users(self):
+        return self._users
+
+    def new_batch_http_request(self, callback):
+        self.batch_count += 1
+        return FakeBatch(callback)
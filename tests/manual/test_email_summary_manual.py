@@ -191,12 +191,10 @@ if __name__ == "__main__":
     print("🚀 FastMCP Gmail - Email Summary Tool Manual Test")
     print("=" * 55)
 
-    # Check if credentials exist
-    cred_files = [
-        "credentials.json",
-        str(Path.home() / ".local/fastmcp_gmail/credentials.json"),
-    ]
-    has_credentials = any(os.path.exists(f) for f in cred_files)
+    # Check if credentials exist; the user config path is only built if needed
+    has_credentials = os.path.exists("credentials.json") or os.path.exists(
+        Path.home() / ".local" / "fastmcp_gmail" / "credentials.json"
+    )
 
     if not has_credentials:
         print("❌ No Gmail credentials found!")
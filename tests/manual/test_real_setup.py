@@ -3,9 +3,11 @@
 Test script to verify real Gmail setup readiness
 """
 
+import functools
 import os
 import sys
 import logging
+from importlib.util import find_spec
 from pathlib import Path
 
 # Add the project root to Python path for imports
@@ -17,9 +19,15 @@ logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=256)
+def _cached_exists(path):
+    # The checks only read the tree, so a path's existence cannot change
+    return os.path.exists(path)
+
+
 def check_file_exists(filepath, description):
     """Check if a file exists and report status"""
-    if os.path.exists(filepath):
+    if _cached_exists(str(filepath)):
         logger.info(f"✅ {description}: {filepath}")
         return True
     else:
@@ -63,12 +71,17 @@ def check_dependencies():
         "pytest",
     ]
 
+    # find_spec only locates each module (importing its parent packages)
+    # rather than running its body; a missing parent package raises
     missing_modules = []
     for module in required_modules:
         try:
-            __import__(module)
-            logger.info(f"✅ {module}")
+            found = find_spec(module) is not None
         except ImportError:
+            found = False
+        if found:
+            logger.info(f"✅ {module}")
+        else:
             logger.error(f"❌ {module}")
             missing_modules.append(module)
 
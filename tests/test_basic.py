@@ -2,12 +2,16 @@
 Basic tests for FastMCP Gmail project
 """
 
+import asyncio
+import tempfile
+import time
 import unittest
-import os
-import sys
+from pathlib import Path
+from unittest.mock import patch
 
-# Add the project root to the path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from core import json_io, llm_cache, semantic_cache
+from core.mcp_agent import MCPAgent
+from tools.parse_email import extract_subject_and_sender
 
 
 class TestImports(unittest.TestCase):
@@ -52,15 +56,12 @@ class TestMCPAgent(unittest.TestCase):
 
     def test_agent_creation(self):
         """Test creating an MCPAgent instance"""
-        from core.mcp_agent import MCPAgent
-
         agent = MCPAgent()
         self.assertIsNotNone(agent)
         self.assertIsNone(agent.local_llm)
 
     def test_agent_with_mock_llm(self):
         """Test MCPAgent with a mock LLM"""
-        from core.mcp_agent import MCPAgent
 
         def mock_llm(prompt):
             return {"text": "Mock response", "confidence": 0.9}
@@ -71,7 +72,6 @@ class TestMCPAgent(unittest.TestCase):
 
     def test_agent_low_confidence(self):
         """Test MCPAgent with low confidence response"""
-        from core.mcp_agent import MCPAgent
 
         def low_confidence_llm(prompt):
             return {"text": "Uncertain response", "confidence": 0.5}
@@ -82,8 +82,6 @@ class TestMCPAgent(unittest.TestCase):
 
     def test_agent_no_llm(self):
         """Test MCPAgent without LLM"""
-        from core.mcp_agent import MCPAgent
-
         agent = MCPAgent()
         response = agent.run("Test prompt")
         self.assertTrue(response.startswith("[No LLM available]"))
@@ -93,46 +91,284 @@ class TestLLMCache(unittest.TestCase):
     """Test LLM caching functionality"""
 
     def setUp(self):
-        """Setup test environment"""
-        # Clean up any existing cache files
-        import os
-        import shutil
-
-        for cache_dir in ["cache", "logs"]:
-            if os.path.exists(cache_dir):
-                shutil.rmtree(cache_dir)
+        """Start from an empty LLM cache"""
+        # conftest.py points these at a temporary directory
+        for path in (llm_cache.CACHE_FILE, llm_cache.JOURNAL_FILE):
+            if path.exists():
+                path.unlink()
+        llm_cache.reset()
 
     def tearDown(self):
-        """Clean up test environment"""
-        import os
-        import shutil
-
-        for cache_dir in ["cache", "logs"]:
-            if os.path.exists(cache_dir):
-                shutil.rmtree(cache_dir)
+        """Clean up the LLM cache"""
+        self.setUp()
 
     def test_cache_operations(self):
         """Test basic cache load/save operations"""
-        from core.llm_cache import load_cache, save_cache
-
         # Test empty cache (should be empty after cleanup)
-        cache = load_cache()
+        cache = llm_cache.load_cache()
         self.assertEqual(cache, {})
 
         # Test save and load
         test_data = {"test_prompt": {"text": "test_response", "confidence": 0.9}}
-        save_cache(test_data)
-        loaded_cache = load_cache()
+        llm_cache.save_cache(test_data)
+        loaded_cache = llm_cache.load_cache()
         self.assertEqual(loaded_cache, test_data)
 
+    def test_cache_journal(self):
+        """Test that new responses are journaled and compacted into the cache file"""
+
+        def mock_llm(prompt):
+            return {"text": "journaled response", "confidence": 0.9}
+
+        llm_cache.cached_llm("journal prompt", mock_llm)
+        self.assertTrue(llm_cache.JOURNAL_FILE.exists())
+        self.assertEqual(
+            llm_cache.load_cache()[llm_cache.prompt_key("journal prompt")]["text"],
+            "journaled response",
+        )
+
+        llm_cache.compact_cache()
+        self.assertFalse(llm_cache.JOURNAL_FILE.exists())
+        self.assertTrue(llm_cache.CACHE_FILE.exists())
+        self.assertEqual(
+            llm_cache.load_cache()[llm_cache.prompt_key("journal prompt")]["text"],
+            "journaled response",
+        )
+
+    def test_compact_keeps_other_process_entries(self):
+        """Test that compaction keeps entries journaled by another process"""
+
+        def mock_llm(prompt):
+            return {"text": f"Response to {prompt}", "confidence": 0.9}
+
+        llm_cache.cached_llm("own prompt", mock_llm)
+        # Another process appends to the journal after this one has loaded
+        other_key = llm_cache.prompt_key("other prompt")
+        with llm_cache.JOURNAL_FILE.open("ab") as f:
+            f.write(json_io.dumps({other_key: {"text": "other", "cached_at": 1.0}}) + b"\n")
+
+        llm_cache.compact_cache()
+        cache = llm_cache.load_cache()
+        self.assertEqual(cache[other_key]["text"], "other")
+        self.assertEqual(
+            cache[llm_cache.prompt_key("own prompt")]["text"],
+            "Response to own prompt",
+        )
+
+    def test_cached_llm_async(self):
+        """Test async cached LLM calls only run the LLM on a cache miss"""
+        calls = []
+
+        async def mock_llm(prompt):
+            calls.append(prompt)
+            return {"text": f"Response to {prompt}", "confidence": 0.9}
+
+        async def run_prompts():
+            return await asyncio.gather(
+                llm_cache.cached_llm_async("prompt A", mock_llm),
+                llm_cache.cached_llm_async("prompt B", mock_llm),
+            )
+
+        first = asyncio.run(run_prompts())
+        second = asyncio.run(run_prompts())
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[0]["text"], "Response to prompt A")
+        self.assertEqual(sorted(calls), ["prompt A", "prompt B"])
+
+    def test_cached_llm_with_prefix(self):
+        """Test that the fixed prefix is passed separately as the system prompt"""
+        calls = []
+
+        def mock_llm(prompt, system=None):
+            calls.append((system, prompt))
+            return {"text": "prefixed response", "confidence": 0.9}
+
+        first = llm_cache.cached_llm_with_prefix("Instructions", "Email A", mock_llm)
+        second = llm_cache.cached_llm_with_prefix("Instructions", "Email A", mock_llm)
+        llm_cache.cached_llm_with_prefix("Instructions", "Email B", mock_llm)
+
+        self.assertEqual(first, second)
+        self.assertEqual(calls, [("Instructions", "Email A"), ("Instructions", "Email B")])
+
+    def test_legacy_prompt_keys(self):
+        """Test caches keyed by full prompt text still produce hits"""
+        llm_cache.save_cache({"old prompt": {"text": "old", "confidence": 0.9}})
+        llm_cache.reset()
+
+        result = llm_cache.cached_llm("old prompt", lambda prompt: 1 / 0)
+        self.assertEqual(result["text"], "old")
+
+    def test_cache_survives_restart(self):
+        """Test that responses are reloaded from disk and failures are not kept"""
+        llm_cache.cached_llm("kept prompt", lambda prompt: {"text": "kept", "confidence": 0.9})
+        llm_cache.cached_llm("failed prompt", lambda prompt: {"text": "[error]", "confidence": 0.0})
+        llm_cache.reset()
+
+        kept = llm_cache.cached_llm("kept prompt", lambda prompt: 1 / 0)
+        retried = llm_cache.cached_llm(
+            "failed prompt", lambda prompt: {"text": "ok", "confidence": 0.9}
+        )
+        self.assertEqual(kept, {"text": "kept", "confidence": 0.9})
+        self.assertEqual(retried["text"], "ok")
+
+    def test_cache_expiry(self):
+        """Test that entries older than CACHE_EXPIRY_HOURS are regenerated"""
+
+        def mock_llm(prompt):
+            return {"text": f"at {time.time()}", "confidence": 0.9}
+
+        first = llm_cache.cached_llm("aging prompt", mock_llm)
+        later = time.time() + 2 * 3600
+        with patch.object(llm_cache, "CACHE_EXPIRY_HOURS", 1):
+            self.assertEqual(llm_cache.cached_llm("aging prompt", mock_llm), first)
+            with patch("core.llm_cache.time.time", return_value=later):
+                regenerated = llm_cache.cached_llm("aging prompt", mock_llm)
+        self.assertNotEqual(regenerated, first)
+
+
+class TestSemanticCache(unittest.TestCase):
+    """Test similarity caching of LLM responses"""
+
+    def setUp(self):
+        """Start from an empty semantic cache"""
+        for cache in (semantic_cache._prompt_cache, semantic_cache._email_set_cache):
+            cache.reset()
+            if cache.path.exists():
+                cache.path.unlink()
+
+    def tearDown(self):
+        """Clean up the semantic cache"""
+        for cache in (semantic_cache._prompt_cache, semantic_cache._email_set_cache):
+            cache.reset()
+            if cache.path.exists():
+                cache.path.unlink()
+
+    def test_similar_prompt_reuses_response(self):
+        """Test that a near-duplicate prompt is answered from the cache"""
+        embeddings = {
+            "Weekly newsletter #41": [1.0, 0.1, 0.0],
+            "Weekly newsletter #42": [0.98, 0.12, 0.01],
+            "Invoice overdue": [0.0, 0.2, 1.0],
+        }
+        calls = []
+
+        async def embed(prompt):
+            return embeddings[prompt]
+
+        async def mock_llm(prompt):
+            calls.append(prompt)
+            return {"text": f"Summary of {prompt}", "confidence": 0.9}
+
+        async def run(prompt):
+            return await semantic_cache.semantic_cached_llm_async(
+                prompt, mock_llm, embed_func=embed
+            )
+
+        with patch.object(semantic_cache, "SEMANTIC_CACHE_ENABLED", True):
+            first = asyncio.run(run("Weekly newsletter #41"))
+            similar = asyncio.run(run("Weekly newsletter #42"))
+            different = asyncio.run(run("Invoice overdue"))
+
+        self.assertEqual(similar, first)
+        self.assertEqual(different["text"], "Summary of Invoice overdue")
+        self.assertEqual(calls, ["Weekly newsletter #41", "Invoice overdue"])
+        # A borrowed response is not stored as an exact entry for the new prompt
+        self.assertIsNone(llm_cache.lookup("Weekly newsletter #42"))
+
+        # Entries survive a reload from disk
+        semantic_cache._prompt_cache.reset()
+        self.assertEqual(semantic_cache.find_similar([1.0, 0.1, 0.0]), first)
+
+    def test_email_set_cache(self):
+        """Test that inbox summaries are reused for the same or a similar email set"""
+        inbox = [
+            {"id": "a", "subject": "Standup", "sender": "team@example.com"},
+            {"id": "b", "subject": "Invoice", "sender": "billing@example.com"},
+        ]
+        grown = inbox + [{"id": "c", "subject": "Lunch?", "sender": "amy@example.com"}]
+        embeddings = iter([[1.0, 0.0], [0.99, 0.05]])
+        calls = []
+
+        def llm_call():
+            calls.append(1)
+            return {"text": "Inbox summary", "confidence": 0.9}
+
+        def embed(text):
+            return next(embeddings)
+
+        with patch.object(semantic_cache, "SEMANTIC_CACHE_ENABLED", True):
+            first = semantic_cache.email_set_cached(inbox, llm_call, embed)
+            same = semantic_cache.email_set_cached(list(reversed(inbox)), llm_call, embed)
+            similar = semantic_cache.email_set_cached(grown, llm_call, embed)
+
+        self.assertEqual(first, same)
+        self.assertEqual(first, similar)
+        self.assertEqual(len(calls), 1)
+        stats = semantic_cache._email_set_cache.stats
+        self.assertEqual((stats["exact_hits"], stats["similar_hits"]), (1, 1))
+
+        # Expired entries are not reused
+        later = time.time() + 60
+        with patch.object(semantic_cache._email_set_cache, "ttl", 30), patch(
+            "core.semantic_cache.time.time", return_value=later
+        ):
+            self.assertIsNone(
+                semantic_cache._email_set_cache.get(semantic_cache.email_set_fingerprint(inbox))
+            )
+
+    def test_cache_is_bounded_and_compacted(self):
+        """Test the oldest entries are dropped and the file is rewritten"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "semantic.jsonl"
+            cache = semantic_cache.SemanticCache(path, max_entries=2)
+            for i in range(4):
+                cache.remember(f"response {i}", key=f"key {i}")
+            self.assertIsNone(cache.get("key 1"))
+            self.assertEqual(len(path.read_bytes().splitlines()), 4)
+
+            # The file is rewritten once it holds twice max_entries lines
+            cache.remember("response 4", key="key 4")
+            self.assertEqual(len(path.read_bytes().splitlines()), 2)
+
+            cache.reset()
+            self.assertIsNone(cache.get("key 2"))
+            self.assertEqual(cache.get("key 3"), "response 3")
+            self.assertEqual(cache.get("key 4"), "response 4")
+
+
+class TestJsonIO(unittest.TestCase):
+    """Test cache JSON helpers"""
+
+    def test_round_trip_without_orjson(self):
+        """Test the stdlib fallback produces bytes that load back"""
+        data = {"prompt": {"text": "Résumé ✓", "confidence": 0.9}}
+        with patch.object(json_io, "orjson", None):
+            encoded = json_io.dumps(data, pretty=True)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json_io.loads(encoded), data)
+        self.assertEqual(json_io.loads(json_io.dumps(data)), data)
+
+    def test_load_file(self):
+        """Test files load the same with and without orjson"""
+        data = {"prompt": {"text": "Résumé ✓", "confidence": 0.9}}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "cache.json"
+            path.write_bytes(json_io.dumps(data, pretty=True))
+            self.assertEqual(json_io.load_file(path), data)
+            with patch.object(json_io, "orjson", None):
+                self.assertEqual(json_io.load_file(path), data)
+
+            path.write_bytes(b"")
+            with self.assertRaises(ValueError):
+                json_io.load_file(path)
+
 
 class TestEmailParsing(unittest.TestCase):
     """Test email parsing utilities"""
 
     def test_parse_email_headers(self):
         """Test email header parsing"""
-        from tools.parse_email import extract_subject_and_sender
-
         raw_email = """Subject: Test Subject
 From: test@example.com
 To: recipient@example.com
@@ -143,6 +379,21 @@ Test email body
         self.assertEqual(result["subject"], "Test Subject")
         self.assertEqual(result["sender"], "test@example.com")
 
+    def test_parse_email_headers_folded_encoded_bytes(self):
+        """Test folded, encoded and bytes headers, with a body that looks like headers"""
+        raw_email = (
+            b"From: Test User\r\n <test@example.com>\r\n"
+            b"Subject: =?utf-8?q?Caf=C3=A9_menu?=\r\n"
+            b"\r\n"
+            b"Subject: not a header\r\n"
+        )
+        result = extract_subject_and_sender(raw_email)
+        self.assertEqual(result["subject"], "Café menu")
+        self.assertEqual(result["sender"], "Test User <test@example.com>")
+
+        result = extract_subject_and_sender("To: someone@example.com\n\nFrom: body\n")
+        self.assertEqual(result, {"subject": "", "sender": ""})
+
 
 if __name__ == "__main__":
     unittest.main()
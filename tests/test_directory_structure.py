@@ -9,50 +9,50 @@ from pathlib import Path
 import sys
 import os
 
-# Add the project root to Python path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
+# Expected path endings, with this platform's separator
+LLM_CACHE_SUFFIX = os.path.join("cache", "llm_cache.json")
+EMAIL_CACHE_SUFFIX = os.path.join("cache", "email_summary_cache.json")
+LLM_LOG_SUFFIX = os.path.join("logs", "llm_log.md")
+SERVER_LOG_SUFFIX = os.path.join("logs", "fastmcp_server.log")
 
 
 class TestDirectoryStructure(unittest.TestCase):
     """Test that cache and log files are properly organized in dedicated directories"""
 
-    def setUp(self):
-        """Set up test environment with temporary directory"""
-        self.test_dir = Path(tempfile.mkdtemp())
-        self.original_cwd = os.getcwd()
-        os.chdir(self.test_dir)
+    @classmethod
+    def setUpClass(cls):
+        """Create one temporary directory shared by the tests in this class"""
+        cls.test_dir = Path(tempfile.mkdtemp())
 
-        # Create project structure
-        (self.test_dir / "core").mkdir()
-        (self.test_dir / "cache").mkdir()
-        (self.test_dir / "logs").mkdir()
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the shared temporary directory"""
+        shutil.rmtree(cls.test_dir)
 
-    def tearDown(self):
-        """Clean up test environment"""
-        os.chdir(self.original_cwd)
-        shutil.rmtree(self.test_dir)
+    def setUp(self):
+        """Create the project structure in the temporary directory"""
+        for name in ("core", "cache", "logs"):
+            (self.test_dir / name).mkdir(exist_ok=True)
 
     def test_cache_directory_structure(self):
         """Test that cache files are created in cache/ directory"""
         # Test LLM cache
         from core.llm_cache import CACHE_FILE
 
-        self.assertTrue(str(CACHE_FILE).endswith("cache/llm_cache.json"))
+        self.assertTrue(str(CACHE_FILE).endswith(LLM_CACHE_SUFFIX))
         self.assertTrue("cache" in str(CACHE_FILE))
 
         # Test email summary cache
         from core.email_summarizer import CACHE_FILE as EMAIL_CACHE_FILE
 
-        self.assertTrue(
-            str(EMAIL_CACHE_FILE).endswith("cache/email_summary_cache.json")
-        )
+        self.assertTrue(str(EMAIL_CACHE_FILE).endswith(EMAIL_CACHE_SUFFIX))
         self.assertTrue("cache" in str(EMAIL_CACHE_FILE))
 
     def test_logs_directory_structure(self):
         """Test that log files are created in logs/ directory"""
         from core.llm_log import LOG_FILE
 
-        self.assertTrue(str(LOG_FILE).endswith("logs/llm_log.md"))
+        self.assertTrue(str(LOG_FILE).endswith(LLM_LOG_SUFFIX))
         self.assertTrue("logs" in str(LOG_FILE))
 
     def test_directory_creation(self):
@@ -103,10 +103,11 @@ class TestDirectoryStructure(unittest.TestCase):
 
     def test_log_functionality(self):
         """Test that logging functionality works with new directory structure"""
-        from core.llm_log import log_prompt_response, LOG_FILE
+        from core.llm_log import flush_log, log_prompt_response, LOG_FILE
 
         # Test logging
         log_prompt_response("test prompt", "test response")
+        flush_log()
 
         # Verify file was created in correct location
         self.assertTrue(LOG_FILE.exists())
@@ -162,27 +163,25 @@ class TestDirectoryStructure(unittest.TestCase):
 class TestMCPServerLogging(unittest.TestCase):
     """Test MCP server logging configuration"""
 
-    def setUp(self):
-        """Set up test environment"""
-        self.test_dir = Path(tempfile.mkdtemp())
-        self.original_cwd = os.getcwd()
-        os.chdir(self.test_dir)
-        (self.test_dir / "logs").mkdir()
+    @classmethod
+    def setUpClass(cls):
+        """Create one temporary directory shared by the tests in this class"""
+        cls.test_dir = Path(tempfile.mkdtemp())
+        (cls.test_dir / "logs").mkdir()
 
-    def tearDown(self):
-        """Clean up test environment"""
-        os.chdir(self.original_cwd)
-        shutil.rmtree(self.test_dir)
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the shared temporary directory"""
+        shutil.rmtree(cls.test_dir)
 
     def test_mcp_server_log_location(self):
         """Test that MCP server creates logs in logs/ directory"""
         # Mock the setup_logging function behavior
-        project_dir = Path.cwd()
-        log_dir = project_dir / "logs"
+        log_dir = self.test_dir / "logs"
         log_file = log_dir / "fastmcp_server.log"
 
         # Verify the expected path structure
-        self.assertTrue(str(log_file).endswith("logs/fastmcp_server.log"))
+        self.assertTrue(str(log_file).endswith(SERVER_LOG_SUFFIX))
         self.assertEqual(log_file.name, "fastmcp_server.log")
         self.assertEqual(log_file.parent.name, "logs")
 
@@ -258,16 +257,22 @@ class TestEnvironmentConfiguration(unittest.TestCase):
 
 
 if __name__ == "__main__":
-    # Create a test suite combining all test cases
-    loader = unittest.TestLoader()
-    suite = unittest.TestSuite()
+    # conftest.py does not run when this file is run as a script
+    sys.path.insert(0, str(Path(__file__).parent.parent))
 
-    # Add all test classes
-    suite.addTests(loader.loadTestsFromTestCase(TestDirectoryStructure))
-    suite.addTests(loader.loadTestsFromTestCase(TestMCPServerLogging))
-    suite.addTests(loader.loadTestsFromTestCase(TestGitignoreConfiguration))
-    suite.addTests(loader.loadTestsFromTestCase(TestMakefileIntegration))
-    suite.addTests(loader.loadTestsFromTestCase(TestEnvironmentConfiguration))
+    # Create a test suite combining all test cases; the classes define their
+    # tests directly, so their own namespaces list every test method
+    suite = unittest.TestSuite()
+    for test_case in (
+        TestDirectoryStructure,
+        TestMCPServerLogging,
+        TestGitignoreConfiguration,
+        TestMakefileIntegration,
+        TestEnvironmentConfiguration,
+    ):
+        suite.addTests(
+            test_case(name) for name in vars(test_case) if name.startswith("test_")
+        )
 
     # Run the tests
     runner = unittest.TextTestRunner(verbosity=2)
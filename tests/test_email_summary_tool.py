@@ -3,54 +3,61 @@ Unit tests for send_email_summary MCP tool
 Tests the email summary functionality without requiring real Gmail API calls
 """
 
+import asyncio
+import base64
+import threading
 import pytest
 import unittest
 from unittest.mock import Mock, patch, MagicMock
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import sys
-import os
+from email import message_from_bytes
+from email.header import decode_header, make_header
+import shutil
+import tempfile
+from pathlib import Path
 
-# Add project root to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from core.email_summarizer import create_email_body
+from core.gmail_client import build_raw_message
 
 
 class TestEmailSummaryTool(unittest.TestCase):
     """Test cases for the send_email_summary MCP tool"""
 
+    # Email summaries shared by the tests; a tuple so no test can modify it
+    SAMPLE_SUMMARIES = (
+        (
+            "Meeting Tomorrow",
+            "Project meeting scheduled for 2 PM with agenda items discussion.",
+        ),
+        (
+            "Invoice #12345",
+            "Payment reminder for services rendered last month, due next week.",
+        ),
+        (
+            "Newsletter Update",
+            "Weekly tech news covering AI developments and cloud computing trends.",
+        ),
+    )
+
     def setUp(self):
         """Set up test fixtures"""
-        self.mock_service = Mock()
+        # Build the users().messages().send().execute() chain once
+        self.mock_execute = Mock(return_value={"id": "test_message_id_123"})
+        self.mock_messages = Mock(
+            send=Mock(return_value=Mock(execute=self.mock_execute))
+        )
+        self.mock_service = Mock(
+            users=Mock(
+                return_value=Mock(messages=Mock(return_value=self.mock_messages))
+            )
+        )
         self.mock_reader = Mock()
 
-        # Mock email summaries data
-        self.sample_summaries = [
-            (
-                "Meeting Tomorrow",
-                "Project meeting scheduled for 2 PM with agenda items discussion.",
-            ),
-            (
-                "Invoice #12345",
-                "Payment reminder for services rendered last month, due next week.",
-            ),
-            (
-                "Newsletter Update",
-                "Weekly tech news covering AI developments and cloud computing trends.",
-            ),
-        ]
-
     def test_create_email_body_formatting(self):
         """Test email body creation with proper formatting"""
         # Import the function we're testing
-        from email.mime.text import MIMEText
-        import base64
-
-        def create_email_body(summaries):
-            lines = []
-            for subject, summary in summaries:
-                lines.append(f"🧾 *{subject}*\n{summary}\n")
-            return "\n---\n\n".join(lines)
-
-        body = create_email_body(self.sample_summaries)
+        body = create_email_body(self.SAMPLE_SUMMARIES)
 
         # Test formatting
         self.assertIn("🧾 *Meeting Tomorrow*", body)
@@ -70,23 +77,36 @@ class TestEmailSummaryTool(unittest.TestCase):
 
     def test_mime_message_creation(self):
         """Test MIME message creation and encoding"""
-        from email.mime.text import MIMEText
-        import base64
-
-        test_body = "Test email summary content"
-        message = MIMEText(test_body)
-        message["to"] = "test@example.com"
-        message["from"] = "me"
-        message["subject"] = "Test Subject"
-
-        # Test message encoding
-        raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
+        test_body = "Test email summary content – ✓"
+        raw = build_raw_message("test@example.com", "📬 Test Subject", test_body)
 
-        self.assertTrue(len(raw) > 0)
         self.assertIsInstance(raw, str)
-        # Verify it's valid base64
-        decoded = base64.urlsafe_b64decode(raw)
-        self.assertTrue(len(decoded) > 0)
+        # Verify it's valid base64 and parses back to the same message
+        message = message_from_bytes(base64.urlsafe_b64decode(raw))
+        self.assertEqual(message["To"], "test@example.com")
+        self.assertEqual(message["From"], "me")
+        self.assertEqual(
+            str(make_header(decode_header(message["Subject"]))), "📬 Test Subject"
+        )
+        self.assertEqual(message.get_payload(decode=True).decode("utf-8"), test_body)
+
+        with self.assertRaises(ValueError):
+            build_raw_message("a@example.com\r\nBcc: b@example.com", "Hi", "")
+        with self.assertRaises(ValueError):
+            build_raw_message("a@example.com", "Hi\r\nBcc: b@example.com", "")
+
+    def test_mime_message_long_lines(self):
+        """Test that long generated lines stay within the line length limit"""
+        test_body = "é" * 2000 + "\nshort line\n"
+        raw = build_raw_message("test@example.com", "Résumé " * 20, test_body)
+
+        raw_bytes = base64.urlsafe_b64decode(raw)
+        self.assertNotIn(b"\n", raw_bytes.replace(b"\r\n", b""))
+        head, _, body = raw_bytes.partition(b"\r\n\r\n")
+        self.assertTrue(all(len(line) <= 78 for line in head.split(b"\r\n")))
+        self.assertTrue(all(len(line) <= 76 for line in body.split(b"\r\n")))
+        message = message_from_bytes(raw_bytes)
+        self.assertEqual(message.get_payload(decode=True).decode("utf-8"), test_body)
 
     @patch("core.email_summarizer.summarize_emails")
     @patch("core.gmail_client.get_gmail_service")
@@ -97,11 +117,6 @@ class TestEmailSummaryTool(unittest.TestCase):
         mock_service = Mock()
         mock_gmail_service.return_value = mock_service
 
-        # Import and test the function
-        sys.path.insert(
-            0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-        )
-
         # Simulate the tool function logic
         summaries = mock_summarize.return_value
 
@@ -122,13 +137,11 @@ class TestEmailSummaryTool(unittest.TestCase):
     def test_send_email_summary_with_emails(self, mock_gmail_service, mock_summarize):
         """Test successful email summary sending"""
         # Mock email summaries
-        mock_summarize.return_value = self.sample_summaries
+        mock_summarize.return_value = self.SAMPLE_SUMMARIES
 
         # Mock Gmail service
-        mock_service = Mock()
-        mock_send_result = {"id": "test_message_id_123"}
-        mock_service.users().messages().send().execute.return_value = mock_send_result
-        mock_gmail_service.return_value = mock_service
+        mock_gmail_service.return_value = self.mock_service
+        mock_send_result = self.mock_execute.return_value
 
         # Simulate successful sending
         summaries = mock_summarize.return_value
@@ -151,10 +164,10 @@ class TestEmailSummaryTool(unittest.TestCase):
     def test_max_emails_limiting(self):
         """Test that max_emails parameter limits the number of summaries"""
         # Test with more summaries than max_emails
-        large_summaries = self.sample_summaries + [
+        large_summaries = self.SAMPLE_SUMMARIES + (
             ("Extra Email 1", "Additional email content 1"),
             ("Extra Email 2", "Additional email content 2"),
-        ]
+        )
 
         max_emails = 3
         limited_summaries = large_summaries[:max_emails]
@@ -195,19 +208,13 @@ class TestEmailSummaryTool(unittest.TestCase):
 
         # Simulate complete email body creation
         def create_complete_email_body(summaries):
-            def create_email_body(summaries):
-                lines = []
-                for subject, summary in summaries:
-                    lines.append(f"🧾 *{subject}*\n{summary}\n")
-                return "\n---\n\n".join(lines)
-
             body = create_email_body(summaries)
             header = f"📊 Summary of {len(summaries)} unread emails:\n\n"
             footer = f"\n\n---\n📤 Generated by FastMCP Gmail Assistant at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
 
             return header + body + footer
 
-        complete_body = create_complete_email_body(self.sample_summaries)
+        complete_body = create_complete_email_body(self.SAMPLE_SUMMARIES)
 
         # Test complete structure
         self.assertIn("📊 Summary of 3 unread emails", complete_body)
@@ -216,6 +223,125 @@ class TestEmailSummaryTool(unittest.TestCase):
         self.assertIn("---", complete_body)
 
 
+class TestEmailSummarizer(unittest.TestCase):
+    """Test cases for core.email_summarizer"""
+
+    @patch("core.email_summarizer.append_cache")
+    @patch("core.email_summarizer.fetch_email_records")
+    @patch("core.email_summarizer.fetch_unread_messages")
+    @patch("core.email_summarizer.get_gmail_service")
+    @patch("core.email_summarizer.load_cache")
+    def test_only_uncached_emails_are_fetched(
+        self, mock_load, mock_service, mock_unread, mock_fetch, mock_append
+    ):
+        """Test that cached emails skip the fetch, prompt and cache write"""
+        from core.email_summarizer import summarize_emails
+        from core.gmail_reader import EmailRecord
+
+        mock_load.return_value = {"msg1": {"subject": "Old", "summary": "Done"}}
+        mock_unread.return_value = [{"id": "msg1"}]
+
+        self.assertEqual(summarize_emails(), [])
+        mock_fetch.assert_not_called()
+        mock_append.assert_not_called()
+
+        mock_unread.return_value = [{"id": "msg1"}, {"id": "msg2"}]
+        mock_fetch.return_value = {
+            "msg2": EmailRecord("msg2", "New", "a@example.com", "Hello", [])
+        }
+        with patch(
+            "core.email_summarizer.semantic_cached_llm_async",
+            return_value={"text": "Summary", "confidence": 0.9},
+        ) as mock_llm:
+            summaries = summarize_emails()
+
+        self.assertEqual(summaries, [("New", "Summary")])
+        mock_fetch.assert_called_once_with(mock_service.return_value, ["msg2"])
+        mock_llm.assert_called_once()
+        mock_append.assert_called_once_with(
+            {"msg2": {"subject": "New", "summary": "Summary"}}
+        )
+
+    @patch("core.email_summarizer.append_cache")
+    @patch("core.email_summarizer.fetch_pending_records")
+    def test_failed_summaries_not_cached(self, mock_pending, mock_append):
+        """Test that failed Ollama calls are reported but not cached"""
+        from core.email_summarizer import summarize_emails
+        from core.gmail_reader import EmailRecord
+
+        mock_pending.return_value = [
+            EmailRecord("msg1", "Good", "a@example.com", "Hello", []),
+            EmailRecord("msg2", "Bad", "b@example.com", "Hello", []),
+        ]
+
+        async def mock_llm(prompt, llm_func):
+            if "Subject: Good" in prompt:
+                return {"text": "Summary", "confidence": 0.9}
+            return {"text": "[Ollama error: down]", "confidence": 0.0}
+
+        with patch("core.email_summarizer.semantic_cached_llm_async", mock_llm):
+            summaries = summarize_emails()
+
+        self.assertEqual(
+            summaries, [("Good", "Summary"), ("Bad", "[Ollama error: down]")]
+        )
+        mock_append.assert_called_once_with(
+            {"msg1": {"subject": "Good", "summary": "Summary"}}
+        )
+
+    @patch("core.email_summarizer.append_cache")
+    @patch("core.email_summarizer.fetch_pending_records")
+    def test_gmail_calls_run_on_executor(self, mock_pending, mock_append):
+        """Test that the blocking Gmail and cache calls run off the event loop"""
+        from core.email_summarizer import summarize_emails_async
+        from core.gmail_reader import EmailRecord
+
+        threads = []
+        record = EmailRecord("msg1", "New", "a@example.com", "Hello", [])
+
+        def pending():
+            threads.append(threading.current_thread().name)
+            return [record]
+
+        mock_pending.side_effect = pending
+        mock_append.side_effect = lambda entries: threads.append(
+            threading.current_thread().name
+        )
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gmail")
+        self.addCleanup(executor.shutdown)
+        with patch(
+            "core.email_summarizer.semantic_cached_llm_async",
+            return_value={"text": "Summary", "confidence": 0.9},
+        ):
+            summaries = asyncio.run(summarize_emails_async(executor))
+
+        self.assertEqual(summaries, [("New", "Summary")])
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith("gmail") for name in threads))
+
+    def test_cache_journal(self):
+        """Test that appended summaries are replayed and compacted"""
+        from core import email_summarizer
+
+        test_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, test_dir)
+        with patch.object(
+            email_summarizer, "CACHE_FILE", test_dir / "cache.json"
+        ), patch.object(email_summarizer, "JOURNAL_FILE", test_dir / "cache.jsonl"):
+            email_summarizer.save_cache({"msg1": {"subject": "Old", "summary": "A"}})
+            email_summarizer.append_cache({"msg2": {"subject": "New", "summary": "B"}})
+            self.assertTrue(email_summarizer.JOURNAL_FILE.exists())
+            expected = {
+                "msg1": {"subject": "Old", "summary": "A"},
+                "msg2": {"subject": "New", "summary": "B"},
+            }
+            self.assertEqual(email_summarizer.load_cache(), expected)
+
+            email_summarizer.compact_cache()
+            self.assertFalse(email_summarizer.JOURNAL_FILE.exists())
+            self.assertEqual(email_summarizer.load_cache(), expected)
+
+
 if __name__ == "__main__":
     # Run tests with verbose output
     unittest.main(verbosity=2)
@@ -0,0 +1,119 @@
+"""
+Test cases for Gmail service construction in core.gmail_client
+"""
+
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+
+class TestBuildGmailService(unittest.TestCase):
+    """Test cases for _build_gmail_service"""
+
+    def setUp(self):
+        """Create credential and token files in a temporary directory"""
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.credentials_file = self.test_dir / "credentials.json"
+        self.token_file = self.test_dir / "token.json"
+        self.credentials_file.write_text("{}")
+        self.token_file.write_text('{"token": "cached"}')
+
+        self.config_patch = patch.dict(
+            "core.gmail_client.ENV_CONFIG",
+            {
+                "credentials_file": str(self.credentials_file),
+                "token_file": str(self.token_file),
+            },
+        )
+        self.config_patch.start()
+
+    def tearDown(self):
+        """Clean up temporary files"""
+        self.config_patch.stop()
+        shutil.rmtree(self.test_dir)
+
+    def make_creds(self, expires_in):
+        """Mock credentials that expire expires_in from now"""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        creds = Mock(valid=True, refresh_token="refresh", expiry=now + expires_in)
+        creds.to_json.return_value = '{"token": "refreshed"}'
+        return creds
+
+    def build_service(self, creds):
+        """Build a service from the given credentials with the API client mocked"""
+        from core.gmail_client import _build_gmail_service
+
+        with patch(
+            "core.gmail_client.Credentials.from_authorized_user_info",
+            return_value=creds,
+        ), patch("core.gmail_client.build") as mock_build:
+            service = _build_gmail_service()
+        self.assertIs(service, mock_build.return_value)
+        return mock_build
+
+    def test_uses_bundled_discovery_document(self):
+        """Test that the service is built without fetching the discovery document"""
+        mock_build = self.build_service(self.make_creds(timedelta(hours=1)))
+
+        kwargs = mock_build.call_args.kwargs
+        self.assertTrue(kwargs["static_discovery"])
+        self.assertFalse(kwargs["cache_discovery"])
+
+    def test_responses_parsed_with_json_io(self):
+        """Test that the service parses responses through json_io"""
+        from core.gmail_client import _GmailJsonModel
+
+        mock_build = self.build_service(self.make_creds(timedelta(hours=1)))
+
+        model = mock_build.call_args.kwargs["model"]
+        self.assertIsInstance(model, _GmailJsonModel)
+        self.assertEqual(model.deserialize(b'{"id": "msg1"}'), {"id": "msg1"})
+        self.assertEqual(model.deserialize(b"Not Found"), "Not Found")
+
+    def test_valid_token_is_not_refreshed(self):
+        """Test that a token well before expiry is used as is"""
+        creds = self.make_creds(timedelta(hours=1))
+        self.build_service(creds)
+
+        creds.refresh.assert_not_called()
+        self.assertEqual(self.token_file.read_text(), '{"token": "cached"}')
+
+    def test_token_near_expiry_is_refreshed(self):
+        """Test that a token inside the skew window is refreshed and saved"""
+        creds = self.make_creds(timedelta(seconds=60))
+        self.build_service(creds)
+
+        creds.refresh.assert_called_once()
+        self.assertEqual(self.token_file.read_text(), '{"token": "refreshed"}')
+
+    def test_unchanged_token_is_not_rewritten(self):
+        """Test that saving identical credentials leaves token.json untouched"""
+        from core.gmail_client import _save_token
+
+        mtime = self.token_file.stat().st_mtime_ns
+        with patch("core.gmail_client.os.replace") as mock_replace:
+            _save_token(str(self.token_file), '{"token": "cached"}', '{"token": "cached"}')
+
+        mock_replace.assert_not_called()
+        self.assertEqual(self.token_file.stat().st_mtime_ns, mtime)
+
+    def test_token_write_is_atomic(self):
+        """Test that a failed write keeps the old token and leaves no temp file"""
+        from core.gmail_client import _save_token
+
+        with patch("core.gmail_client.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                _save_token(str(self.token_file), '{"token": "new"}')
+
+        self.assertEqual(self.token_file.read_text(), '{"token": "cached"}')
+        self.assertEqual(
+            sorted(p.name for p in self.test_dir.iterdir()),
+            ["credentials.json", "token.json"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@
 Integration tests for Gmail Reader with organized directory structure
 """
 
+import pytest
 import unittest
 import tempfile
 import shutil
@@ -14,36 +15,36 @@ from unittest.mock import Mock, patch
 # Add the project root to Python path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from core.gmail_reader import GmailReader
+from tests.fakes import FakeGmailService
+
+# Cache and log paths are imported inside the tests: conftest.py points them
+# at a temporary directory only after this module has been collected
+
 
 class TestGmailReaderIntegration(unittest.TestCase):
     """Integration tests for Gmail Reader with cache and log organization"""
 
-    def setUp(self):
-        """Set up test environment"""
-        self.test_dir = Path(tempfile.mkdtemp())
-        self.original_cwd = os.getcwd()
-        os.chdir(self.test_dir)
+    @classmethod
+    def setUpClass(cls):
+        """Create one project tree shared by the tests in this class"""
+        cls.test_dir = Path(tempfile.mkdtemp())
+        (cls.test_dir / "core").mkdir()
+        (cls.test_dir / "cache").mkdir()
+        (cls.test_dir / "logs").mkdir()
 
-        # Create project structure
-        (self.test_dir / "core").mkdir()
-        (self.test_dir / "cache").mkdir()
-        (self.test_dir / "logs").mkdir()
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the shared project tree"""
+        shutil.rmtree(cls.test_dir)
 
+    def setUp(self):
+        """Set up test environment"""
         # Create mock Gmail service
         self.mock_service = Mock()
 
-    def tearDown(self):
-        """Clean up test environment"""
-        os.chdir(self.original_cwd)
-        shutil.rmtree(self.test_dir)
-
     def test_gmail_reader_with_cache_integration(self):
         """Test Gmail Reader integration with cache functionality"""
-        from core.gmail_reader import GmailReader
-
-        # Create Gmail reader instance
-        reader = GmailReader(self.mock_service)
-
         # Mock email data
         mock_email_data = {
             "id": "test_email_id",
@@ -62,13 +63,22 @@ class TestGmailReaderIntegration(unittest.TestCase):
             "labelIds": ["INBOX"],
         }
 
-        # Mock Gmail API calls
-        self.mock_service.users().messages().get().execute.return_value = (
-            mock_email_data
-        )
+        # Create Gmail reader instance over a fake Gmail API
+        service = FakeGmailService({"test_email_id": mock_email_data})
+        reader = GmailReader(service)
 
-        # Test reading email
+        # Test reading email; the second read takes the body from the message
+        # cache and only fetches the current labels
         result = reader.read_email_by_id("test_email_id")
+        mock_email_data["labelIds"] = ["INBOX", "UNREAD"]
+        second = reader.read_email_by_id("test_email_id")
+        self.assertEqual(second["content"], result["content"])
+        self.assertEqual(second["labels"], ["INBOX", "UNREAD"])
+        self.assertTrue(second["metadata"]["is_unread"])
+        self.assertEqual(
+            [call["format"] for call in service.messages.get_calls],
+            ["full", "minimal"],
+        )
 
         # Verify structure
         self.assertIsNotNone(result)
@@ -104,7 +114,9 @@ class TestGmailReaderIntegration(unittest.TestCase):
 
         # Verify file location
         self.assertTrue(CACHE_FILE.exists())
-        self.assertTrue(str(CACHE_FILE).endswith("cache/email_summary_cache.json"))
+        self.assertTrue(
+            str(CACHE_FILE).endswith(os.path.join("cache", "email_summary_cache.json"))
+        )
 
         # Verify content
         loaded = load_cache()
@@ -112,17 +124,18 @@ class TestGmailReaderIntegration(unittest.TestCase):
 
     def test_llm_logging_integration(self):
         """Test LLM logging with organized logs directory"""
-        from core.llm_log import LOG_FILE, log_prompt_response
+        from core.llm_log import LOG_FILE, flush_log, log_prompt_response
 
         # Test logging
         test_prompt = "Summarize this email: Test content"
         test_response = "Summary: Test email about content"
 
         log_prompt_response(test_prompt, test_response)
+        flush_log()
 
         # Verify file location
         self.assertTrue(LOG_FILE.exists())
-        self.assertTrue(str(LOG_FILE).endswith("logs/llm_log.md"))
+        self.assertTrue(str(LOG_FILE).endswith(os.path.join("logs", "llm_log.md")))
 
         # Verify content
         content = LOG_FILE.read_text()
@@ -133,8 +146,7 @@ class TestGmailReaderIntegration(unittest.TestCase):
     def test_mcp_server_logging_setup(self):
         """Test MCP server logging configuration"""
         # Import and test the logging setup logic
-        project_dir = Path.cwd()
-        log_dir = project_dir / "logs"
+        log_dir = self.test_dir / "logs"
         log_file = log_dir / "fastmcp_server.log"
 
         # Ensure log directory exists
@@ -183,18 +195,12 @@ class TestGmailReaderIntegration(unittest.TestCase):
         # Verify file exists
         self.assertTrue(CACHE_FILE.exists())
 
-        # Simulate fresh import by reloading module
-        import importlib
-        import core.llm_cache
-
-        importlib.reload(core.llm_cache)
+        # Simulate a fresh process by dropping the in-memory copy
+        from core import llm_cache
 
-        # Load with fresh import
-        from core.llm_cache import load_cache
+        llm_cache.reset()
 
-        loaded_data = load_cache()
-
-        self.assertEqual(loaded_data, test_data)
+        self.assertEqual(llm_cache.load_cache(), test_data)
 
     def test_directory_permissions_and_creation(self):
         """Test directory creation and permissions"""
@@ -239,19 +245,16 @@ class TestGmailReaderIntegration(unittest.TestCase):
 class TestBackwardCompatibility(unittest.TestCase):
     """Test backward compatibility with old directory structure"""
 
-    def setUp(self):
-        """Set up test environment"""
-        self.test_dir = Path(tempfile.mkdtemp())
-        self.original_cwd = os.getcwd()
-        os.chdir(self.test_dir)
-
-        # Create project structure
-        (self.test_dir / "core").mkdir()
+    @classmethod
+    def setUpClass(cls):
+        """Create one project tree shared by the tests in this class"""
+        cls.test_dir = Path(tempfile.mkdtemp())
+        (cls.test_dir / "core").mkdir()
 
-    def tearDown(self):
-        """Clean up test environment"""
-        os.chdir(self.original_cwd)
-        shutil.rmtree(self.test_dir)
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the shared project tree"""
+        shutil.rmtree(cls.test_dir)
 
     def test_migration_from_old_structure(self):
         """Test behavior when old cache files exist in root"""
@@ -281,14 +284,5 @@ class TestBackwardCompatibility(unittest.TestCase):
 
 
 if __name__ == "__main__":
-    # Run integration tests
-    loader = unittest.TestLoader()
-    suite = unittest.TestSuite()
-
-    suite.addTests(loader.loadTestsFromTestCase(TestGmailReaderIntegration))
-    suite.addTests(loader.loadTestsFromTestCase(TestBackwardCompatibility))
-
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-
-    sys.exit(0 if result.wasSuccessful() else 1)
+    # Run through pytest so conftest.py isolates the cache and log files
+    pytest.main([__file__, "-v"])
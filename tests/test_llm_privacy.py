@@ -8,7 +8,9 @@ sensitive information is handled appropriately.
 
 import pytest
 import asyncio
+import inspect
 import logging
+import re
 from unittest.mock import MagicMock, patch, AsyncMock
 import sys
 import os
@@ -19,6 +21,20 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.ollama_llm import ollama_llm_streaming
 from core.gmail_client import get_gmail_service
 
+# Sensitive data patterns, combined so one pass over the text finds them all
+SENSITIVE_RE = re.compile(
+    r"(?P<ssn>\d{3}-\d{2}-\d{4})"
+    r"|(?P<credit_card>\d{4}-\d{4}-\d{4}-\d{4})"
+    r"|(?P<password>password:\s*\w+)",
+    re.IGNORECASE,
+)
+
+
+@pytest.fixture(scope="module")
+def llm_source():
+    """Source of the LLM function, read once for the module's source checks."""
+    return inspect.getsource(ollama_llm_streaming)
+
 
 class TestLLMPrivacy:
     """Test privacy aspects of LLM processing."""
@@ -51,98 +67,87 @@ Jane
             "date": "2024-01-15",
         }
 
-    def test_local_processing_verification(self, llm_function):
+    def test_local_processing_verification(self, llm_source):
         """Verify that LLM processing happens locally."""
-        # Check that the LLM function uses ollama command
-        import inspect
-        source = inspect.getsource(llm_function)
-        assert "ollama" in source.lower()
-        assert "run" in source.lower()
-        print(f"✅ LLM configured for local processing via Ollama CLI")
+        # Check that the LLM function talks to the local Ollama server
+        from core.ollama_llm import OLLAMA_HOST
+        assert "ollama" in llm_source.lower()
+        assert "localhost" in OLLAMA_HOST or "127.0.0.1" in OLLAMA_HOST
+        print(f"✅ LLM configured for local processing via Ollama at {OLLAMA_HOST}")
 
     def test_no_external_calls_during_summarization(self, llm_function, mock_email_content):
-        """Test that summarization uses local ollama command."""
+        """Test that summarization uses the local Ollama API."""
         
-        # Test with mock subprocess to avoid actual ollama call
-        with patch("subprocess.Popen") as mock_popen:
-            mock_process = MagicMock()
-            mock_process.stdout.readline.side_effect = [
-                "This is a test response\n",
-                "from local ollama\n",
-                ""  # End of output
+        # Test with a mock connection to avoid an actual ollama call
+        with patch("core.ollama_llm._connection") as mock_connection:
+            mock_response = MagicMock()
+            mock_response.status = 200
+            mock_response.__iter__.return_value = [
+                b'{"message": {"role": "assistant", "content": "This is a test response "}, "done": false}\n',
+                b'{"message": {"role": "assistant", "content": "from local ollama"}, "done": false}\n',
+                b'{"message": {"role": "assistant", "content": ""}, "done": true}\n',
             ]
-            mock_popen.return_value = mock_process
+            mock_connection.return_value.getresponse.return_value = mock_response
 
             result = llm_function("Test prompt")
             
-            # Verify subprocess was called with ollama
-            mock_popen.assert_called_once()
-            call_args = mock_popen.call_args[0][0]
-            assert "ollama" in call_args
-            assert "run" in call_args
+            # Verify the prompt was sent to the Ollama chat endpoint
+            mock_connection.return_value.request.assert_called_once()
+            method, path = mock_connection.return_value.request.call_args[0][:2]
+            assert (method, path) == ("POST", "/api/chat")
+            assert result["text"] == "This is a test response from local ollama"
             
-            print(f"✅ LLM uses local ollama command: {call_args}")
+            print(f"✅ LLM uses local ollama API: {method} {path}")
             print(f"✅ Response generated: {result.get('text', 'No text')}")
 
     def test_sensitive_data_handling(self):
         """Test that sensitive data patterns are identified."""
-        # This would be implemented with actual privacy filtering
-        sensitive_patterns = [
-            r"\d{3}-\d{2}-\d{4}",  # SSN
-            r"\d{4}-\d{4}-\d{4}-\d{4}",  # Credit card
-            r"password:\s*\w+",  # Password
-        ]
-
         test_content = "SSN: 123-45-6789, Card: 1234-5678-9012-3456, Password: secret"
 
-        for pattern in sensitive_patterns:
-            import re
-
-            matches = re.findall(pattern, test_content, re.IGNORECASE)
-            if matches:
-                print(f"⚠️ Sensitive pattern detected: {pattern} -> {matches}")
+        found = {
+            match.lastgroup: match.group()
+            for match in SENSITIVE_RE.finditer(test_content)
+        }
+        for name, value in found.items():
+            print(f"⚠️ Sensitive pattern detected: {name} -> {value}")
 
+        assert found == {
+            "ssn": "123-45-6789",
+            "credit_card": "1234-5678-9012-3456",
+            "password": "Password: secret",
+        }
         print("✅ Sensitive data detection test completed")
 
-    def test_privacy_configuration(self, llm_function):
+    def test_privacy_configuration(self, llm_source):
         """Test privacy-related configuration settings."""
         # Check that logging is configured appropriately
         logger = logging.getLogger("ollama_llm")
         assert logger is not None
 
         # Verify the function doesn't expose debugging information
-        import inspect
-        source = inspect.getsource(llm_function)
         # Should not contain debug prints or verbose logging
-        assert "debug" not in source.lower()
+        assert "debug" not in llm_source.lower()
 
         print("✅ Privacy configuration test completed")
 
-    def test_data_retention_policy(self, llm_function):
+    def test_data_retention_policy(self, llm_source):
         """Test that email content is not retained after processing."""
         # This is a conceptual test - verify that the function:
         # 1. Doesn't write files
         # 2. Doesn't persist data
-        # 3. Uses subprocess (ephemeral)
-        
-        import inspect
-        source = inspect.getsource(llm_function)
-        
-        # Verify it uses subprocess (ephemeral execution)
-        assert "subprocess" in source
+        # 3. Only sends the prompt to the local Ollama server
         
         # Verify it doesn't write files to disk (look for file writing patterns)
         file_write_patterns = ["open(", "file(", ".write(", "with open"]
-        file_writing = any(pattern in source and ("w" in source or "a" in source) for pattern in file_write_patterns if pattern != "Popen")
+        file_writing = any(pattern in llm_source and ("w" in llm_source or "a" in llm_source) for pattern in file_write_patterns if pattern != "Popen")
         
         # More specific check - look for actual file opening patterns
-        import re
         file_open_pattern = r'open\s*\([^)]*["\'][wa]'
-        has_file_writes = bool(re.search(file_open_pattern, source))
+        has_file_writes = bool(re.search(file_open_pattern, llm_source))
         
         assert not has_file_writes, "Function should not write files to disk"
         
-        print("✅ Data retention policy test completed - uses ephemeral subprocess execution")
+        print("✅ Data retention policy test completed - prompts are only sent to Ollama")
 
 
 if __name__ == "__main__":
@@ -18,90 +18,74 @@ from core.gmail_client import get_gmail_service
 from core.gmail_reader import create_gmail_reader
 
 
+@pytest.fixture(scope="module")
+def latest_emails(gmail_service):
+    """Latest emails, fetched once and shared by the tests that only inspect them."""
+    try:
+        return create_gmail_reader(service=gmail_service).read_emails(count=5)
+    except Exception as e:
+        pytest.skip(f"Gmail API access not available: {e}")
+
+
 class TestGmailEmailReading:
     """Test suite for Gmail email reading functionality."""
 
-    def test_gmail_service_initialization(self):
+    def test_gmail_service_initialization(self, gmail_service):
         """Test that Gmail service can be initialized successfully."""
-        try:
-            service = get_gmail_service()
-            assert service is not None, "Gmail service should be initialized"
-            print("✅ Gmail service initialized successfully")
-        except Exception as e:
-            pytest.skip(f"Gmail authentication not available: {e}")
+        assert gmail_service is not None, "Gmail service should be initialized"
+        print("✅ Gmail service initialized successfully")
 
-    def test_gmail_reader_creation(self):
+    def test_gmail_reader_creation(self, gmail_service):
         """Test that Gmail reader can be created with a valid service."""
-        try:
-            service = get_gmail_service()
-            reader = create_gmail_reader(service=service)
-            assert reader is not None, "Gmail reader should be created"
-            print("✅ Gmail reader created successfully")
-        except Exception as e:
-            pytest.skip(f"Gmail authentication not available: {e}")
+        reader = create_gmail_reader(service=gmail_service)
+        assert reader is not None, "Gmail reader should be created"
+        print("✅ Gmail reader created successfully")
 
-    def test_read_latest_emails_integration(self):
+    def test_read_latest_emails_integration(self, latest_emails):
         """Integration test for reading latest emails from Gmail."""
-        try:
-            # Initialize Gmail service and reader
-            service = get_gmail_service()
-            reader = create_gmail_reader(service=service)
-            
-            # Read a small number of emails to avoid API limits
-            emails = reader.read_emails(count=3)
-            
-            # Validate email structure
-            assert isinstance(emails, list), "Emails should be returned as a list"
+        emails = latest_emails[:3]
+        
+        # Validate email structure
+        assert isinstance(emails, list), "Emails should be returned as a list"
+        
+        if len(emails) > 0:
+            email = emails[0]
+            # Check required fields
+            assert 'id' in email, "Email should have an ID"
+            assert 'subject' in email, "Email should have a subject"
+            assert 'sender' in email, "Email should have a sender"
+            assert 'date' in email, "Email should have a date"
             
-            if len(emails) > 0:
-                email = emails[0]
-                # Check required fields
-                assert 'id' in email, "Email should have an ID"
-                assert 'subject' in email, "Email should have a subject"
-                assert 'sender' in email, "Email should have a sender"
-                assert 'date' in email, "Email should have a date"
-                
-                print(f"✅ Successfully retrieved {len(emails)} emails")
-                print(f"   First email: '{email.get('subject', 'No Subject')}' from {email.get('sender', 'Unknown')}")
-            else:
-                print("✅ Email reading successful (no emails found)")
-                
-        except Exception as e:
-            pytest.skip(f"Gmail API access not available: {e}")
+            print(f"✅ Successfully retrieved {len(emails)} emails")
+            print(f"   First email: '{email.get('subject', 'No Subject')}' from {email.get('sender', 'Unknown')}")
+        else:
+            print("✅ Email reading successful (no emails found)")
 
-    def test_email_data_structure(self):
+    def test_email_data_structure(self, latest_emails):
         """Test the structure and content of retrieved email data."""
-        try:
-            service = get_gmail_service()
-            reader = create_gmail_reader(service=service)
-            emails = reader.read_emails(count=1)
+        if len(latest_emails) > 0:
+            email = latest_emails[0]
             
-            if len(emails) > 0:
-                email = emails[0]
-                
-                # Test required fields exist
-                required_fields = ['id', 'subject', 'sender', 'date']
-                for field in required_fields:
-                    assert field in email, f"Email should contain '{field}' field"
-                
-                # Test optional fields that might exist
-                optional_fields = ['content', 'metadata']
-                for field in optional_fields:
-                    if field in email:
-                        print(f"✅ Optional field '{field}' present")
-                
-                # Test metadata structure if present
-                if 'metadata' in email:
-                    metadata = email['metadata']
-                    assert isinstance(metadata, dict), "Metadata should be a dictionary"
-                    print("✅ Email metadata structure validated")
-                    
-                print("✅ Email data structure validated")
-            else:
-                pytest.skip("No emails available for structure testing")
+            # Test required fields exist
+            required_fields = ['id', 'subject', 'sender', 'date']
+            for field in required_fields:
+                assert field in email, f"Email should contain '{field}' field"
+            
+            # Test optional fields that might exist
+            optional_fields = ['content', 'metadata']
+            for field in optional_fields:
+                if field in email:
+                    print(f"✅ Optional field '{field}' present")
+            
+            # Test metadata structure if present
+            if 'metadata' in email:
+                metadata = email['metadata']
+                assert isinstance(metadata, dict), "Metadata should be a dictionary"
+                print("✅ Email metadata structure validated")
                 
-        except Exception as e:
-            pytest.skip(f"Gmail API access not available: {e}")
+            print("✅ Email data structure validated")
+        else:
+            pytest.skip("No emails available for structure testing")
 
     @patch('tests.test_recent_emails.get_gmail_service')
     def test_error_handling_invalid_service(self, mock_service):
@@ -114,11 +98,10 @@ class TestGmailEmailReading:
         
         print("✅ Error handling for invalid service tested")
 
-    def test_email_count_parameter(self):
+    def test_email_count_parameter(self, gmail_service):
         """Test that the count parameter correctly limits email retrieval."""
         try:
-            service = get_gmail_service()
-            reader = create_gmail_reader(service=service)
+            reader = create_gmail_reader(service=gmail_service)
             
             # Test different count values
             for count in [1, 2, 5]:
@@ -129,19 +112,17 @@ class TestGmailEmailReading:
         except Exception as e:
             pytest.skip(f"Gmail API access not available: {e}")
 
-    def test_email_query_parameter(self):
+    def test_email_query_parameter(self, gmail_service, latest_emails):
         """Test email retrieval with search queries."""
         try:
-            service = get_gmail_service()
-            reader = create_gmail_reader(service=service)
+            reader = create_gmail_reader(service=gmail_service)
             
             # Test with a simple query (unread emails)
             unread_emails = reader.read_emails(count=5, query="is:unread")
             assert isinstance(unread_emails, list), "Query result should be a list"
             
-            # Test with no query (default behavior)
-            all_emails = reader.read_emails(count=5)
-            assert isinstance(all_emails, list), "Default query result should be a list"
+            # No query (default behavior) is what latest_emails fetched
+            assert isinstance(latest_emails, list), "Default query result should be a list"
             
             print(f"✅ Query parameter tested - found {len(unread_emails)} unread emails")
             
@@ -1,8 +1,66 @@
-from email import message_from_string
+import re
+from email.errors import HeaderParseError
+from email.header import decode_header, make_header
 
+# The header block ends at the first empty line, with either line ending
+_HEADER_END = re.compile(r"\r?\n\r?\n")
+_HEADER_END_BYTES = re.compile(rb"\r?\n\r?\n")
+_WANTED = ("subject", "from")
 
-def extract_subject_and_sender(raw_email: str):
-    msg = message_from_string(raw_email)
-    subject = msg.get("Subject", "")
-    sender = msg.get("From", "")
-    return {"subject": subject, "sender": sender}
+
+def _decode(value):
+    # Only RFC 2047 encoded-words need the header decoder
+    if "=?" not in value:
+        return value
+    try:
+        return str(make_header(decode_header(value)))
+    except (HeaderParseError, LookupError, UnicodeError):
+        return value
+
+
+def extract_subject_and_sender(raw_email):
+    """
+    Subject and sender of a raw message, read from the header block only
+
+    Only the lines before the first empty line are scanned; the body is never
+    touched or parsed. Folded header lines are unfolded and encoded-words are
+    decoded.
+
+    Args:
+        raw_email: Raw RFC 822 message as str or bytes
+    """
+    if isinstance(raw_email, (bytes, bytearray)):
+        # Decode the header block alone rather than the whole message
+        end = _HEADER_END_BYTES.search(raw_email)
+        head = bytes(raw_email[: end.start()] if end else raw_email)
+        head = head.decode("utf-8", errors="replace")
+    else:
+        end = _HEADER_END.search(raw_email)
+        head = raw_email[: end.start()] if end else raw_email
+
+    headers = {}
+    current = None
+    for line in head.split("\n"):
+        line = line.rstrip("\r")
+        if not line:
+            break
+        if line[0] in " \t":
+            # Continuation of a folded header
+            if current is not None:
+                headers[current] += line
+            continue
+        if len(headers) == len(_WANTED):
+            break
+        name, sep, value = line.partition(":")
+        name = name.strip().lower()
+        # The first occurrence of a header wins
+        if sep and name in _WANTED and name not in headers:
+            headers[name] = value
+            current = name
+        else:
+            current = None
+
+    return {
+        "subject": _decode(headers.get("subject", "").strip()),
+        "sender": _decode(headers.get("from", "").strip()),
+    }